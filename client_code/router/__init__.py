@@ -7,6 +7,7 @@ from anvil.history import history as _history
 from . import hooks
 from ._alert import alert, confirm
 from ._cached import clear_cache
+from ._client_metrics import disable_client_metrics, enable_client_metrics
 from ._constants import (
     CACHE_FIRST,
     NETWORK_FIRST,
@@ -14,14 +15,41 @@ from ._constants import (
     STALE_WHILE_REVALIDATE,
 )
 from ._context import RoutingContext
-from ._exceptions import NotFound, Redirect
+from ._exceptions import InvalidQuery, NotFound, Redirect
+from ._instrumentation import (
+    InstrumentationSink,
+    MemorySink,
+    PerformanceSink,
+    add_instrumentation_sink,
+    remove_instrumentation_sink,
+)
 from ._invalidate import invalidate
 from ._loader import ensure_data, use_data
 from ._logger import debug_logging, logger
 from ._navigate import navigate
+from ._query_schema import QueryField
 from ._register_links import register_links
 from ._route import Route, TemplateWithContainerRoute, open_form, sorted_routes
 from ._router import NavigationBlocker, launch, navigation_emitter
+from ._server_cache import (
+    CacheBackend,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    get_server_cache,
+    use_server_cache_backend,
+)
+from ._server_metrics import (
+    get_client_metrics,
+    get_server_metrics,
+    record_client_metrics,
+    reset_client_metrics,
+    reset_server_metrics,
+)
+from ._server_profiling import (
+    disable_profiling,
+    enable_profiling,
+    summarize_profiles,
+)
 from ._url import get_url
 from ._view_transition import use_transitions
 
@@ -1,14 +1,129 @@
 # Copyright (c) 2024-2026 Anvil
 # SPDX-License-Identifier: MIT
 
+import anvil
+
 __version__ = "0.6.1"
 
+
+class _StartupEntry:
+    # a compact entry sent from the server, see CachedData.to_startup
+    def __init__(self, entry, received_at):
+        self.entry = entry
+        self.received_at = received_at
+
+    def hydrate(self):
+        from ._loader import CachedData
+
+        return CachedData.from_startup(self.entry, self.received_at)
+
+    def get_age(self, now):
+        # entries are [url, data, age, stale], age is in seconds when it was sent
+        return (now - self.received_at).total_seconds() + self.entry[2]
+
+
+class DataCache(dict):
+    """Cached data, keyed by match.key
+
+    Entries sent from the server are only turned into CachedData when they're used.
+    """
+
+    def load_startup(self, startup_cache):
+        from datetime import datetime
+
+        received_at = datetime.now()
+        for key, entry in startup_cache["entries"].items():
+            dict.__setitem__(self, key, _StartupEntry(entry, received_at))
+
+    def _hydrate(self, key, value):
+        if not isinstance(value, _StartupEntry):
+            return value
+        cached = value.hydrate()
+        dict.__setitem__(self, key, cached)
+        return cached
+
+    def __getitem__(self, key):
+        return self._hydrate(key, dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        if isinstance(value, _StartupEntry):
+            return value.hydrate()
+        return value
+
+    def items(self):
+        return [(key, self[key]) for key in list(self.keys())]
+
+    def get_gc_keys(self, min_gc_time):
+        """The keys of entries that should be garbage collected
+
+        Startup entries aren't hydrated until they're older than min_gc_time,
+        the shortest gc_time of any route, since until then none can have expired.
+        """
+        from datetime import datetime
+
+        now = datetime.now()
+        keys = []
+        for key, value in list(dict.items(self)):
+            if isinstance(value, _StartupEntry):
+                if value.get_age(now) <= min_gc_time:
+                    continue
+                value = self._hydrate(key, value)
+            if value._should_gc():
+                keys.append(key)
+        return keys
+
+    def values(self):
+        return [self[key] for key in list(self.keys())]
+
+    def copy(self):
+        return dict(self.items())
+
+
 CACHED_FORMS = {}
-CACHED_DATA = {}
+CACHED_DATA = DataCache()
+# meta for routes with cache_meta, keyed by match.key like the data
+CACHED_META = {}
+# meta isn't garbage collected with the data, so keep it bounded
+MAX_CACHED_META = 100
 IN_FLIGHT_DATA = {}
 
+if anvil.is_server_side():
+    from threading import local
+
+    _request = local()
+else:
+    _request = None
+
 
 def clear_cache():
     CACHED_FORMS.clear()
     CACHED_DATA.clear()
+    CACHED_META.clear()
     IN_FLIGHT_DATA.clear()
+
+
+def get_request_cache():
+    # only set while a route is being served from the server
+    return getattr(_request, "cache", None)
+
+
+class RequestCache:
+    """Collects the data sent to the client for a single server request"""
+
+    def __init__(self, data=None):
+        self.data = {} if data is None else data
+
+    def __enter__(self):
+        self.prev = get_request_cache()
+        _request.cache = self.data
+        return self.data
+
+    def __exit__(self, *exc_args):
+        _request.cache = self.prev
+        return False
@@ -0,0 +1,131 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+import anvil.server
+
+from ._instrumentation import (
+    InstrumentationSink,
+    add_instrumentation_sink,
+    remove_instrumentation_sink,
+)
+from ._logger import logger
+from ._non_blocking import call_async
+from ._utils import setTimeout
+
+__version__ = "0.6.1"
+
+
+class ClientMetricsSink(InstrumentationSink):
+    """Collects a sample for each navigation and sends them to the server in batches"""
+
+    def __init__(self, server_function, max_samples=200, batch_size=50, flush_delay=5):
+        self.server_function = server_function
+        self.max_samples = max_samples
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.samples = []
+        self.dropped = 0
+        # phases of the navigation in progress, the navigation span comes last
+        self._phases = {}
+        self._cache = None
+        self._scheduled = False
+        self._flushing = False
+
+    def on_span(self, span):
+        name = span.name
+        if name != "navigation":
+            self._phases[name] = self._phases.get(name, 0) + span.duration
+            if name == "data":
+                self._cache = span.attrs.get("cache")
+            return
+
+        phases, cache = self._phases, self._cache
+        self._phases, self._cache = {}, None
+        route = span.attrs.get("route")
+        if route is None:
+            return
+        self.add(
+            {
+                "route": route,
+                "total": round(span.duration, 1),
+                "phases": {phase: round(d, 1) for phase, d in phases.items()},
+                "cache": cache,
+            }
+        )
+
+    def add(self, sample):
+        if len(self.samples) >= self.max_samples:
+            # the server can't keep up, so drop the sample rather than growing
+            self.dropped += 1
+            return
+        self.samples.append(sample)
+        self._schedule()
+
+    def _schedule(self):
+        if self._scheduled or self._flushing:
+            return
+        self._scheduled = True
+        setTimeout(self._flush_when_idle, self.flush_delay * 1000)
+
+    def _flush_when_idle(self):
+        if anvil.is_server_side():
+            return self.flush()
+        from anvil.js import window
+
+        request_idle = getattr(window, "requestIdleCallback", None)
+        if request_idle is None:
+            # e.g. safari
+            return self.flush()
+        request_idle(lambda deadline: self.flush(), {"timeout": 5000})
+
+    def flush(self):
+        self._scheduled = False
+        if self._flushing or not self.samples:
+            return
+        if self.dropped:
+            logger.debug(f"dropped {self.dropped} client metrics samples")
+            self.dropped = 0
+        batch = {"samples": self.samples[: self.batch_size]}
+        del self.samples[: self.batch_size]
+        self._flushing = True
+
+        def send():
+            with anvil.server.no_loading_indicator:
+                return anvil.server.call_s(self.server_function, batch)
+
+        call_async(send).then(self._on_flushed)
+
+    def _on_flushed(self, result):
+        _, error = result
+        self._flushing = False
+        if error is not None:
+            # metrics are best effort, so the batch isn't retried
+            logger.debug(f"unable to send client metrics: {error!r}")
+        if self.samples:
+            self._schedule()
+
+
+_sink = None
+
+
+def enable_client_metrics(
+    server_function, max_samples=200, batch_size=50, flush_delay=5
+):
+    """Send a timing sample for each navigation to server_function
+
+    Samples are sent in batches of up to batch_size when the browser is idle,
+    at most every flush_delay seconds. At most max_samples are kept while
+    waiting for the server, any more are dropped.
+    """
+    global _sink
+    disable_client_metrics()
+    _sink = ClientMetricsSink(server_function, max_samples, batch_size, flush_delay)
+    add_instrumentation_sink(_sink)
+    return _sink
+
+
+def disable_client_metrics():
+    global _sink
+    if _sink is not None:
+        remove_instrumentation_sink(_sink)
+        _sink = None
@@ -11,13 +11,19 @@ _DEFAULTS = {
     "routes_module": "routes",
     "robots": False,
     "sitemap": False,
+    "sitemap_cache_time": 60 * 60,
+    "metrics_endpoint": False,
+    "server_workers": 8,
+    "server_timeout_workers": 8,
+    "server_preload_workers": 4,
 }
 
 
 def get_routing_config():
     try:
         config = anvil.app.get_client_config("routing")
-    except AttributeError:
+    except Exception:
+        # e.g. an older runtime without get_client_config, or an uplink that isn't connected
         config = {}
     if not isinstance(config, dict):
         return dict(_DEFAULTS)
@@ -33,6 +33,8 @@ class RoutingContext(EventEmitter):
         self._error = None
         self._data = data
         self._revalidating = False
+        # hit, miss, swr or dedupe, set by load_data_promise
+        self._cache_status = None
         self._listeners = {}
         self._blockers = set()
 
@@ -55,6 +57,12 @@ class RoutingContext(EventEmitter):
         if prev_match.hash != self.hash:
             self.raise_event("hash_changed", hash=self.hash)
 
+    def _reuse(self, context):
+        # the open form is kept and before_load isn't run again,
+        # so keep the nav_context it set and merge the new navigation's on top
+        context.nav_context = {**self.nav_context, **context.nav_context}
+        self._update(context)
+
     def _prevent_unload(self):
         for blocker in list(self._blockers):
             if blocker not in self._blockers:
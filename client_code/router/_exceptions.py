@@ -18,6 +18,7 @@ class Redirect(AnvilWrappedError):
         hash=None,
         nav_context=None,
         form_properties=None,
+        permanent=False,
     ):
         self.path = path
         self.query = query
@@ -25,6 +26,7 @@ class Redirect(AnvilWrappedError):
         self.hash = hash
         self.nav_context = ensure_dict(nav_context, "nav_context")
         self.form_properties = ensure_dict(form_properties, "form_properties")
+        self.permanent = permanent
 
 
 class NotFound(AnvilWrappedError):
@@ -35,5 +37,10 @@ class InvalidPathParams(Exception):
     pass
 
 
+class InvalidQuery(AnvilWrappedError):
+    pass
+
+
 _register_exception_type(f"{Redirect.__module__}.Redirect", Redirect)
 _register_exception_type(f"{NotFound.__module__}.NotFound", NotFound)
+_register_exception_type(f"{InvalidQuery.__module__}.InvalidQuery", InvalidQuery)
@@ -4,6 +4,7 @@
 import anvil
 
 from ._config import get_routes_module
+from ._instrumentation import span
 from ._logger import logger
 from ._non_blocking import call_async
 from ._utils import await_promise
@@ -48,24 +49,36 @@ def get_cached_mod(module_name):
     return mod
 
 
-def import_module(module_name):
-    mod = get_cached_mod(module_name)
-    if mod is not None:
-        return mod
+def _import_leaf_module(module_name, package_name):
+    # __import__ returns the top level package, so walk down to the module we asked for
+    mod = __import__(module_name, {"__package__": package_name}, level=1)
+
+    attrs = module_name.split(".")[1:]
+    for attr in attrs:
+        mod = getattr(mod, attr)
+
+    return mod
+
+
+def preload_module(module_name):
+    # start importing without waiting, import_module picks up the in flight import
+    if module_name in _INFLIGHT_MODULE_PROMISES:
+        return
 
     package_name = get_package_name()
 
     _INFLIGHT_MODULE_PROMISES[module_name] = call_async(
-        __import__, module_name, {"__package__": package_name}, level=1
+        _import_leaf_module, module_name, package_name
     )
 
-    mod = get_cached_mod(module_name)
 
-    attrs = module_name.split(".")[1:]
-    for attr in attrs:
-        mod = getattr(mod, attr)
+def import_module(module_name):
+    mod = get_cached_mod(module_name)
+    if mod is not None:
+        return mod
 
-    return mod
+    preload_module(module_name)
+    return get_cached_mod(module_name)
 
 
 def import_form(form, *args, **kws):
@@ -78,11 +91,13 @@ def import_form(form, *args, **kws):
     if not isinstance(form, str):
         raise TypeError(f"expected a form instance or a string, got {form!r}")
 
-    mod = import_module(form)
+    with span("form_import", form=form):
+        mod = import_module(form)
     attrs = form.split(".")
     form_cls = getattr(mod, attrs[-1])
 
-    return form_cls(*args, **kws)
+    with span("form_construct", form=form):
+        return form_cls(*args, **kws)
 
 
 def import_routes():
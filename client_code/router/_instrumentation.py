@@ -0,0 +1,168 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+from ._logger import logger
+from ._utils import now
+
+__version__ = "0.6.1"
+
+# the spans recorded for a client side navigation
+SPANS = (
+    "navigation",
+    "match",
+    "before_load",
+    "meta",
+    "data",
+    "form_import",
+    "form_construct",
+    "transition",
+)
+
+_sinks = []
+
+
+class InstrumentationSink:
+    """Receives the spans and events recorded during navigation
+
+    Subclass this and override on_span and on_event.
+    """
+
+    def on_span(self, span):
+        pass
+
+    def on_event(self, name, attrs):
+        pass
+
+
+class MemorySink(InstrumentationSink):
+    """Keeps every span and event in memory, useful in tests"""
+
+    def __init__(self):
+        self.spans = []
+        self.events = []
+
+    def on_span(self, span):
+        self.spans.append(span)
+
+    def on_event(self, name, attrs):
+        self.events.append((name, attrs))
+
+    def get_spans(self, name=None):
+        return [span for span in self.spans if name is None or span.name == name]
+
+    def clear(self):
+        self.spans.clear()
+        self.events.clear()
+
+
+class PerformanceSink(InstrumentationSink):
+    """Adds spans and events to the browser's performance timeline
+
+    They show up in the performance panel of the browser's devtools,
+    prefixed with router:
+    """
+
+    def __init__(self):
+        from anvil.js.window import performance
+
+        self.performance = performance
+
+    def on_span(self, span):
+        self.performance.measure(
+            f"router:{span.name}",
+            {"start": span.start, "end": span.end, "detail": span.attrs},
+        )
+
+    def on_event(self, name, attrs):
+        self.performance.mark(f"router:{name}", {"detail": attrs})
+
+
+def add_instrumentation_sink(sink):
+    if not isinstance(sink, InstrumentationSink):
+        raise TypeError("sink must be an InstrumentationSink")
+    if sink not in _sinks:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_instrumentation_sink(sink):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = now()
+        self.end = None
+
+    @property
+    def duration(self):
+        if self.end is None:
+            return None
+        return self.end - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self, **attrs):
+        if self.end is not None:
+            return
+        self.end = now()
+        self.attrs.update(attrs)
+        for sink in list(_sinks):
+            try:
+                sink.on_span(self)
+            except Exception as e:
+                logger.error(f"instrumentation sink {sink!r} failed: {e!r}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.finish()
+        return False
+
+    def __repr__(self):
+        return f"<Span {self.name!r} duration={self.duration} {self.attrs!r}>"
+
+
+class _NullSpan:
+    # returned when there are no sinks, so instrumentation costs a function call
+    name = None
+    attrs = {}
+    start = end = duration = None
+
+    def set(self, **attrs):
+        pass
+
+    def finish(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_args):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, **attrs):
+    if not _sinks:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+def event(name, **attrs):
+    if not _sinks:
+        return
+    for sink in list(_sinks):
+        try:
+            sink.on_event(name, attrs)
+        except Exception as e:
+            logger.error(f"instrumentation sink {sink!r} failed: {e!r}")
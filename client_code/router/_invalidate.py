@@ -1,7 +1,9 @@
 # Copyright (c) 2024-2026 Anvil
 # SPDX-License-Identifier: MIT
 
-from ._cached import CACHED_DATA, CACHED_FORMS
+import anvil
+
+from ._cached import CACHED_DATA, CACHED_FORMS, CACHED_META
 from ._constants import STALE_WHILE_REVALIDATE
 from ._logger import logger
 from ._utils import decode_key, ensure_dict, make_key, valid_absolute_path
@@ -17,7 +19,7 @@ def get_invalid_keys(start_path, start_deps):
     else:
         start_parts = start_path.split("/")
 
-    for key in CACHED_DATA.keys() | CACHED_FORMS.keys():
+    for key in CACHED_DATA.keys() | CACHED_FORMS.keys() | CACHED_META.keys():
         path, deps = decode_key(key)
         if path == "/":
             parts = []
@@ -79,8 +81,19 @@ def invalidate(context_or_path=None, *, path=None, deps=None, exact=False):
     else:
         logger.debug("no keys to invalidate")
 
+    if anvil.is_server_side():
+        from ._server_cache import get_server_cache
+
+        server_cache = get_server_cache()
+        if exact:
+            server_cache.invalidate(key)
+        else:
+            # we can't partially match deps without reading every key
+            server_cache.invalidate_path(path)
+
     for key in keys:
         CACHED_FORMS.pop(key, None)
+        CACHED_META.pop(key, None)
 
         cached = CACHED_DATA.pop(key, None)
         if cached is not None and cached.mode == STALE_WHILE_REVALIDATE:
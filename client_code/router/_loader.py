@@ -6,17 +6,21 @@ from time import sleep
 
 import anvil.server
 
-from ._cached import CACHED_DATA, IN_FLIGHT_DATA
+from ._cached import CACHED_DATA, IN_FLIGHT_DATA, get_request_cache
 from ._config import get_raise_on_data_error
 from ._constants import CACHE_FIRST, NETWORK_FIRST, NO_CACHE, STALE_WHILE_REVALIDATE
 from ._logger import logger
-from ._matcher import get_match_from_nav_args
+from ._matcher import get_match_from_nav_args, match_route
 from ._non_blocking import Result, call_async
 from ._utils import await_promise, report_exceptions
 
 __version__ = "0.6.1"
 _UNSET = object()
 
+# preloaded data is for the navigations straight after the page loads
+# after this many seconds it's loaded again, since the route doesn't cache its data
+PRELOAD_MAX_AGE = 30
+
 
 @anvil.server.portable_class
 class CachedData:
@@ -34,6 +38,28 @@ class CachedData:
     def __deserialize__(self, data, gbl_data):
         self.__dict__.update(data, fetched_at=datetime.now())
 
+    def to_startup(self, now):
+        # the client gets the mode and gc_time from the route
+        age = (now - self.fetched_at).total_seconds()
+        return [self.location.get_url(False), self.data, round(age, 3), self.stale]
+
+    @classmethod
+    def from_startup(cls, entry, received_at):
+        from anvil.history import Location
+
+        url, data, age, stale = entry
+        location = Location.from_url(url)
+        route = match_route(location.path)
+        if route is None:
+            # the route has gone, so only use the data once
+            mode, gc_time = NO_CACHE, 0
+        else:
+            mode, gc_time = route.cache_data, route.gc_time
+        cached = cls(data=data, location=location, mode=mode, gc_time=gc_time)
+        cached.fetched_at = received_at - timedelta(seconds=age)
+        cached.stale = stale
+        return cached
+
     def __repr__(self):
         data_repr = repr(self.data)
         if len(data_repr) > 100:
@@ -41,6 +67,12 @@ class CachedData:
         return f"<CachedData '{self.location}' data={data_repr}>"
 
 
+def encode_startup_cache(cache):
+    now = datetime.now()
+    entries = {key: cached.to_startup(now) for key, cached in cache.items()}
+    return {"v": 1, "entries": entries}
+
+
 _initial_request = True
 
 
@@ -102,8 +134,11 @@ def load_data_promise(context, force=False, *, silent=None):
     def create_in_flight_data_promise():
         if key in IN_FLIGHT_DATA:
             logger.debug(f"{key} data already loading in flight")
+            context._cache_status = "dedupe"
             return IN_FLIGHT_DATA[key]
 
+        context._cache_status = "miss"
+
         context._revalidating = True
         data_promise = call_async(wrapped_loader, **context._loader_args)
         data_promise.then(on_result)
@@ -118,6 +153,7 @@ def load_data_promise(context, force=False, *, silent=None):
         fetched_at = cached.fetched_at
         mode = cached.mode
         is_stale = (datetime.now() - fetched_at).total_seconds() > route.stale_time
+        context._cache_status = "hit"
 
         if is_initial:
             logger.debug("initial request, using cache")
@@ -133,10 +169,17 @@ def load_data_promise(context, force=False, *, silent=None):
                     f"{key} - initial request reloading in the background, {STALE_WHILE_REVALIDATE}"
                 )
                 create_in_flight_data_promise()
+                context._cache_status = "swr"
         elif mode == NO_CACHE:
-            # we (probably) shouldn't be here - but just in case
+            # only the server adds uncached data, when it preloads a route
+            # so use it once and load it again next time
             del CACHED_DATA[key]
-            data_promise = create_in_flight_data_promise()
+            if (datetime.now() - fetched_at).total_seconds() <= PRELOAD_MAX_AGE:
+                logger.debug(f"{key} using preloaded data")
+                data_promise = Result(cached.data)
+            else:
+                logger.debug(f"{key} preloaded data is too old, loading")
+                data_promise = create_in_flight_data_promise()
         elif mode == CACHE_FIRST:
             logger.debug(f"{key} loading data from cache")
             data_promise = Result(cached.data)
@@ -150,6 +193,7 @@ def load_data_promise(context, force=False, *, silent=None):
                     f"{key} - reloading in the background, {STALE_WHILE_REVALIDATE}"
                 )
                 create_in_flight_data_promise()
+                context._cache_status = "swr"
         else:
             raise Exception("Unknown cache mode")
 
@@ -223,5 +267,10 @@ def ensure_data(
             gc_time=route.gc_time,
         )
         cached.stale = stale
-        CACHED_DATA[key] = cached
+        # when serving a route from the server, only ship data for this request
+        request_cache = get_request_cache()
+        if request_cache is not None:
+            request_cache[key] = cached
+        else:
+            CACHED_DATA[key] = cached
     return data
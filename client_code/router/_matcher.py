@@ -1,15 +1,16 @@
 # Copyright (c) 2024-2026 Anvil
 # SPDX-License-Identifier: MIT
 
+from ._exceptions import InvalidQuery
 from ._navigate import get_nav_location
 from ._route import Route, sorted_routes
-from ._utils import ensure_dict, loads, make_key, trim_path, url_decode
+from ._utils import ensure_dict, loads, make_key, maybe_json, trim_path, url_decode
 
 __version__ = "0.6.1"
 
 
 class Match:
-    def __init__(self, location, params, query, route: Route) -> None:
+    def __init__(self, location, params, query, route: Route, error=None) -> None:
         self.location = location
         self.path = location.path
         self.params = params
@@ -20,6 +21,8 @@ class Match:
             path=self.path, params=params, query=query, hash=self.hash
         )
         self.key = make_key(self.path, self.deps)
+        # e.g. an InvalidQuery, which is raised before any loaders run
+        self.error = error
 
 
 def get_segments(path):
@@ -46,39 +49,55 @@ def get_match_from_nav_args(context_or_path_or_url, *, path, query, params, hash
     return match
 
 
+def match_segments(route, parts):
+    # returns the raw path params if the parts match the route's segments
+    if len(parts) != len(route.segments):
+        # todo splat
+        return None
+
+    params = {}
+    for part, segment in zip(parts, route.segments):
+        if segment.is_static():
+            if part != segment.value:
+                return None
+        elif segment.is_param():
+            params[segment.value] = url_decode(part)
+        else:
+            raise Exception("Unknown segment type")
+
+    return params
+
+
 def get_match(location):
     path = trim_path(location.path)
     parts = get_segments(path)
 
     for route in sorted_routes:
-        iter_segments = iter(route.segments)
-        params = {}
+        params = match_segments(route, parts)
+        if params is not None:
+            return get_route_match(location, route, params)
 
-        if len(parts) != len(route.segments):
-            # todo splat
-            continue
+    return None
 
-        for part in parts:
-            try:
-                segment = next(iter_segments)
-                if segment.is_static():
-                    if part != segment.value:
-                        break
-                elif segment.is_param():
-                    params[segment.value] = url_decode(part)
-                else:
-                    raise Exception("Unknown segment type")
-            except StopIteration:
-                break
-
-        else:  # if no break
-            params = parse_params(route, params)
-            query = parse_query(route, location.search_params)
-            return Match(location, params, query, route)
 
+def match_route(path):
+    # cheaper than get_match when we only need the route
+    parts = get_segments(trim_path(path))
+    for route in sorted_routes:
+        if match_segments(route, parts) is not None:
+            return route
     return None
 
 
+def get_route_match(location, route, params):
+    params = parse_params(route, params)
+    try:
+        query = parse_query(route, location.search_params)
+    except InvalidQuery as e:
+        return Match(location, params, {}, route, error=e)
+    return Match(location, params, query, route)
+
+
 def get_not_found_match(location, not_found_route_cls):
     path = location.path
     not_found_route = not_found_route_cls()
@@ -96,13 +115,46 @@ def ensure_dict_wrapper(fn):
     return wrapper
 
 
+# decoded query values, keyed by the raw query items
+_decoded_queries = {}
+MAX_DECODED_QUERIES = 100
+
+
+def decode_query(query):
+    try:
+        memo_key = tuple(query.items())
+        decoded = _decoded_queries.get(memo_key)
+    except TypeError:
+        # unhashable values, e.g. a key that appears more than once
+        memo_key = decoded = None
+    if decoded is not None:
+        return decoded
+
+    decoded = {}
+    for key, value in query.items():
+        if isinstance(value, str) and maybe_json(value):
+            try:
+                value = loads(value)
+            except Exception:
+                pass
+        decoded[key] = value
+
+    # lists and dicts could be mutated by the route's parse_query
+    mutable = any(isinstance(value, (list, dict)) for value in decoded.values())
+    if memo_key is not None and not mutable:
+        if len(_decoded_queries) >= MAX_DECODED_QUERIES:
+            _decoded_queries.clear()
+        _decoded_queries[memo_key] = decoded
+    return decoded
+
+
 @ensure_dict_wrapper
 def parse_query(route: Route, query: dict):
-    for key, value in dict(query).items():
-        try:
-            query[key] = loads(value)
-        except Exception:
-            pass
+    schema = route._query_schema
+    if schema is not None:
+        query = schema.decode(query)
+    else:
+        query.update(decode_query(query))
 
     parser = route.parse_query
     if callable(parser):
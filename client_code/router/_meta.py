@@ -9,6 +9,8 @@ from ._utils import document
 __version__ = "0.6.1"
 
 _CACHE = {}
+# the meta dict from the last call to update_meta_tags, after fallbacks
+_last_applied = {}
 
 
 class Node:
@@ -91,6 +93,10 @@ class MetaTagStore:
         return self
 
     def __init__(self, name: str):
+        if hasattr(self, "nodes"):
+            # __new__ returned the cached store, don't look up the nodes again
+            # which would also replace the default content with the current content
+            return
         self.nodes = self.get_nodes(name)
 
     @staticmethod
@@ -126,20 +132,26 @@ def get_tag_store(name: str):
 
 
 def update_meta_tags(meta):
+    global _last_applied
     meta = {**meta}  # copy since we might mutate it
 
     for key, fallback_key in FALLBACK_STORE.items():
         if key not in meta and fallback_key in meta:
             meta[key] = meta[fallback_key]
 
+    # only touch the nodes that changed since the last update
     for name, content in meta.items():
+        if name in _last_applied and _last_applied[name] == content:
+            continue
         tag = get_tag_store(name)
         for node in tag.nodes:
             node.set_content(content)
 
-    # Reset any cached tags that are not present in the current meta dict
-    for name, tag in _CACHE.items():
+    # Reset any tags we set last time that are not present in the current meta dict
+    for name in _last_applied:
         if name in meta:
             continue
-        for node in tag.nodes:
+        for node in _CACHE[name].nodes:
             node.reset()
+
+    _last_applied = meta
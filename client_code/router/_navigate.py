@@ -8,10 +8,13 @@ from ._exceptions import InvalidPathParams
 from ._logger import logger
 from ._segments import Segment
 from ._utils import (
+    clearTimeout,
     dumps,
     encode_query_params,
     ensure_dict,
     loads,
+    maybe_json,
+    setTimeout,
     url_decode,
     url_encode,
 )
@@ -50,6 +53,10 @@ def stringify_value(val):
     if not isinstance(val, str):
         return dumps(val)
 
+    if not maybe_json(val):
+        # most strings, which stay flat like foo=bar
+        return val
+
     try:
         # this way strings are flat like foo=bar
         # and already jsonified strings are returned as is
@@ -59,23 +66,37 @@ def stringify_value(val):
         return val
 
 
-def clean_query_params(query):
-    if not query:
+def get_current_query():
+    from ._context import RoutingContext
+
+    context = RoutingContext._current
+    if context is None:
         return {}
+    return context.query
 
-    if callable(query):
-        from ._context import RoutingContext
 
-        context = RoutingContext._current
-        if context is None:
-            prev = {}
-        else:
-            prev = context.query
+def get_query_schema(path):
+    from . import _route
+    from ._matcher import match_route
 
-        query = query(prev)
+    if not _route.has_query_schemas:
+        return None
+    route = match_route(path)
+    return None if route is None else route._query_schema
+
+
+def clean_query_params(query, schema=None):
+    if not query:
+        return {}
+
+    if callable(query):
+        query = query(get_current_query())
 
         query = ensure_dict(query, "query")
 
+    if schema is not None:
+        return schema.encode(query)
+
     real_query = {}
     keys = sorted(query.keys())
     for key in keys:
@@ -87,14 +108,14 @@ def clean_query_params(query):
 def nav_args_to_location(*, path, query, params, hash):
     if path is not None:
         path = clean_path(path, params or {})
-        query = clean_query_params(query)
+        query = clean_query_params(query, get_query_schema(path))
         search = encode_query_params(query)
         return Location(path=path, search=search, hash=hash)
 
     if query is not None:
         # use the current location as the base
         path = history.location.path
-        query = clean_query_params(query)
+        query = clean_query_params(query, get_query_schema(path))
         search = encode_query_params(query)
         return Location(path=path, search=search, hash=hash)
 
@@ -183,6 +204,55 @@ def navigate_with_location(
         history.push(location)
 
 
+class _PendingNavigation:
+    def __init__(self, location, query, replace, nav_context, form_properties):
+        self.location = location
+        self.query = query
+        self.replace = replace
+        self.nav_context = nav_context
+        self.form_properties = form_properties
+        self.handle = None
+
+
+_pending = None
+
+
+def cancel_pending_navigation():
+    global _pending
+    if _pending is not None:
+        clearTimeout(_pending.handle)
+        _pending = None
+
+
+def _flush_pending_navigation():
+    global _pending
+    pending = _pending
+    _pending = None
+    if pending is None:
+        return
+    logger.debug(f"debounced navigation to {pending.location}")
+    navigate_with_location(
+        pending.location,
+        replace=pending.replace,
+        nav_context=pending.nav_context,
+        form_properties=pending.form_properties,
+    )
+
+
+def _debounce(location, query, replace, nav_context, form_properties, debounce):
+    global _pending
+    prev = _pending
+    if prev is not None:
+        clearTimeout(prev.handle)
+        # the navigations are merged, so only replace if they all asked to
+        replace = replace and prev.replace
+
+    pending = _pending = _PendingNavigation(
+        location, query, replace, nav_context, form_properties
+    )
+    pending.handle = setTimeout(_flush_pending_navigation, debounce * 1000)
+
+
 def navigate(
     context_or_path_or_url=None,
     *,
@@ -193,6 +263,7 @@ def navigate(
     replace=False,
     nav_context=None,
     form_properties=None,
+    debounce=None,
 ):
     logger.debug(
         f"navigate called with: {context_or_path_or_url!r} path={path!r} "
@@ -211,6 +282,17 @@ def navigate(
         if form_properties is not None
         else ""
     )
+    same_path = path is None and context_or_path_or_url is None
+    if debounce is None:
+        # this navigation happens now, so any debounced navigation is out of date
+        cancel_pending_navigation()
+    elif _pending is not None and (callable(query) or (query is None and same_path)):
+        # build on the navigation that hasn't happened yet
+        prev = _pending.query
+        query = prev if query is None else ensure_dict(query(prev), "query")
+    elif callable(query):
+        query = ensure_dict(query(get_current_query()), "query")
+
     location = get_nav_location(
         context_or_path_or_url, path=path, query=query, params=params, hash=hash
     )
@@ -219,6 +301,13 @@ def navigate(
     nav_context = ensure_dict(nav_context, "nav_context")
     form_properties = ensure_dict(form_properties, "form_properties")
 
+    if debounce is not None:
+        if query is None:
+            query = get_current_query() if same_path else {}
+        return _debounce(
+            location, query, replace, nav_context, form_properties, debounce
+        )
+
     return navigate_with_location(
         location,
         replace=replace,
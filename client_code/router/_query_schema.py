@@ -0,0 +1,193 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+from ._exceptions import InvalidQuery
+from ._utils import compress_text, decompress_text, dumps, loads
+
+__version__ = "0.6.1"
+
+
+class QueryField:
+    """A query parameter declared in a route's query_schema"""
+
+    def __init__(self, type=str, default=None, choices=None, compress=False):
+        if type not in _DECODERS:
+            names = ", ".join(t.__name__ for t in _DECODERS)
+            raise TypeError(f"QueryField type must be one of {names}, got {type!r}")
+        self.type = type
+        self.default = default
+        self.choices = None if choices is None else list(choices)
+        self.compress = compress
+
+
+def _decode_str(value):
+    return value
+
+
+def _decode_int(value):
+    return int(value)
+
+
+def _decode_float(value):
+    return float(value)
+
+
+def _decode_bool(value):
+    if value == "true":
+        return True
+    if value == "false":
+        return False
+    raise ValueError(f"expected true or false, got {value!r}")
+
+
+def _json_decoder(type):
+    def decode(value):
+        value = loads(value)
+        if not isinstance(value, type):
+            raise ValueError(f"expected a {type.__name__}, got {value!r}")
+        return value
+
+    return decode
+
+
+_DECODERS = {
+    str: _decode_str,
+    int: _decode_int,
+    float: _decode_float,
+    bool: _decode_bool,
+    list: _json_decoder(list),
+    dict: _json_decoder(dict),
+}
+
+# compressed values are url safe base64, so can't start with ~
+COMPRESSED_PREFIX = "~z"
+# plain values starting with ~ are escaped with another ~
+ESCAPE = "~"
+MAX_MEMOISED = 100
+# compressing and decompressing is slow, especially on the client where it's async
+_compressed = {}
+_decompressed = {}
+
+
+def _memoise(memo, key, fn):
+    value = memo.get(key)
+    if value is None:
+        value = fn(key)
+        if len(memo) >= MAX_MEMOISED:
+            memo.clear()
+        memo[key] = value
+    return value
+
+
+def _compress(value):
+    text = dumps(value)
+    compressed = COMPRESSED_PREFIX + _memoise(_compressed, text, compress_text)
+    # small values can be longer when compressed
+    if len(compressed) < len(text):
+        return compressed
+    plain = value if isinstance(value, str) else text
+    if plain.startswith(ESCAPE):
+        # so that e.g. "~zebra" isn't mistaken for a compressed value
+        return ESCAPE + plain
+    return plain
+
+
+def _compressed_decoder(type, decoder):
+    def decode(value):
+        if value.startswith(ESCAPE + ESCAPE):
+            return decoder(value[len(ESCAPE) :])
+        if not value.startswith(COMPRESSED_PREFIX):
+            return decoder(value)
+        # memoise the text rather than the value, which could be mutated
+        text = _memoise(_decompressed, value[len(COMPRESSED_PREFIX) :], decompress_text)
+        value = loads(text)
+        if not isinstance(value, type):
+            raise ValueError(f"expected a {type.__name__}, got {value!r}")
+        return value
+
+    return decode
+
+
+def _get_decoder(field):
+    decoder = _DECODERS[field.type]
+    if field.compress:
+        return _compressed_decoder(field.type, decoder)
+    return decoder
+
+
+class QuerySchema:
+    """A route's query_schema, compiled when the route is registered"""
+
+    def __init__(self, fields):
+        self.fields = {}
+        for key, field in fields.items():
+            if not isinstance(field, QueryField):
+                raise TypeError(f"query_schema[{key!r}] must be a QueryField")
+            self.fields[key] = field
+        # (key, decoder, default, choices, copy_default)
+        # so decoding doesn't need attribute lookups
+        self._decoders = [
+            (
+                key,
+                _get_decoder(f),
+                f.default,
+                f.choices,
+                isinstance(f.default, (list, dict)),
+            )
+            for key, f in self.fields.items()
+        ]
+        self.defaults = {key: f.default for key, f in self.fields.items()}
+        self.compressed = {key for key, f in self.fields.items() if f.compress}
+
+    def decode(self, raw_query):
+        query = {}
+        for key, decoder, default, choices, copy_default in self._decoders:
+            value = raw_query.get(key)
+            if value is None:
+                # so that changing the query doesn't change the default
+                query[key] = loads(dumps(default)) if copy_default else default
+                continue
+            try:
+                value = decoder(value)
+            except Exception as e:
+                raise InvalidQuery(f"invalid value for {key!r}: {e}")
+            if choices is not None and value not in choices:
+                raise InvalidQuery(
+                    f"invalid value for {key!r}: {value!r} is not one of {choices!r}"
+                )
+            query[key] = value
+        return query
+
+    def encode(self, query):
+        # unknown keys and values that match the default are left out of the url
+        defaults = self.defaults
+        encoded = {}
+        for key in sorted(query):
+            if key not in defaults:
+                continue
+            value = query[key]
+            if value is None or value == defaults[key]:
+                continue
+            if key in self.compressed:
+                encoded[key] = _compress(value)
+            elif isinstance(value, str):
+                encoded[key] = value
+            else:
+                encoded[key] = dumps(value)
+        return encoded
+
+    def without_defaults(self, query):
+        defaults = self.defaults
+        return {
+            key: value
+            for key, value in query.items()
+            if key not in defaults or value != defaults[key]
+        }
+
+
+def compile_query_schema(query_schema):
+    if query_schema is None or isinstance(query_schema, QuerySchema):
+        return query_schema
+    if not isinstance(query_schema, dict):
+        raise TypeError("query_schema must be a dict of QueryFields")
+    return QuerySchema(query_schema)
@@ -4,102 +4,34 @@
 import anvil.server
 from anvil.history import history
 
-from ._cached import CACHED_DATA
 from ._constants import NO_CACHE
-from ._exceptions import Redirect
 from ._import_utils import import_form
-from ._logger import logger
-from ._navigate import nav_args_to_location, navigate
+from ._navigate import navigate
+from ._query_schema import compile_query_schema
 from ._segments import Segment
-from ._utils import encode_query_params, ensure_dict, trim_path
+from ._utils import get_server_callable, trim_path
 
 __version__ = "0.6.1"
 
 sorted_routes = []
 
 default_not_found_route_cls = None
+# lets navigate skip looking up the route when no route has a query schema
+has_query_schemas = False
 
 
-def _create_server_route(cls):
-    # local for now while anvil uplink doesn't have history
-    import traceback
-
-    from anvil.history import Location
-    from anvil.server import AppResponder
-
-    from ._context import RoutingContext
-    from ._loader import CachedData
-    from ._matcher import get_match
-
-    path = cls.path
+def _create_server_route(route):
+    path = route.path
 
     if path is None:
         return
 
     @anvil.server.route(path)
     def route_handler(*args, **kwargs):
-        request = anvil.server.request
-        path = request.path
-        search = encode_query_params(request.query_params)
-        location = Location(path=path, search=search, key="default")
-        match = get_match(location=location)
-        logger.debug(f"serving route from the server: {location}")
-        if match is None:
-            # this shouldn't happen
-            raise Exception(f"No match for '{location}'")
-
-        route = match.route
-        context = RoutingContext(match=match)
-
-        try:
-            nav_context = route.before_load(**context._loader_args)
-            nav_context = ensure_dict(nav_context, "before_load")
-            context.nav_context.update(nav_context)
-        except Redirect as r:
-            location = nav_args_to_location(
-                path=r.path,
-                query=r.query,
-                params=r.params,
-                hash=r.hash,
-            )
-            logger.debug(f"redirecting to {location}")
-            url = location.get_url(True)
-            return anvil.server.HttpResponse(status=302, headers={"Location": url})
-        except Exception as e:
-            # TODO: handle error on the client
-            logger.error(
-                f"{location}: error serving route from the server: {e!r}\n"
-                f"{traceback.format_exc()}"
-            )
-            return AppResponder(data={"cache": CACHED_DATA}).load_app()
-
-        try:
-            meta = route.meta(**context._loader_args)
-        except Exception as e:
-            logger.error(
-                f"error getting meta data for {location}: got {e!r}\n"
-                f"{traceback.format_exc()}"
-            )
-            meta = None
-
-        try:
-            data = route.load_data(**context._loader_args)
-        except Exception as e:
-            logger.error(
-                f"error loading data for {location}, got {e!r}\n"
-                f"{traceback.format_exc()}"
-            )
-            # TODO: handle error on the client
-            return AppResponder(data={"cache": CACHED_DATA}, meta=meta).load_app()
+        # local for now while anvil uplink doesn't have history
+        from ._server_route import serve_route
 
-        mode = route.cache_data
-        gc_time = route.gc_time
-        cached_data = CachedData(
-            data=data, location=location, mode=mode, gc_time=gc_time
-        )
-        CACHED_DATA[match.key] = cached_data
-
-        return AppResponder(data={"cache": CACHED_DATA}, meta=meta).load_app()
+        return serve_route(route, anvil.server.request, **kwargs)
 
 
 class Route:
@@ -112,11 +44,23 @@ class Route:
     pending_delay = 1
     pending_min = 0.5
     cache_data = NO_CACHE
+    query_schema = None
+    _query_schema = None
     stale_time = 0
     cache_form = False
+    cache_meta = False
+    reuse_form = False
+    view_transition = True
     server_fn = None
+    http_cache = False
     server_silent = False
     gc_time = 30 * 60
+    public = False
+    server_cache_time = 60
+    server_render = "full"
+    server_parallel_meta = False
+    server_timeout = None
+    server_preload_time = 0.2
     default_not_found = False
     sitemap = True
 
@@ -144,21 +88,36 @@ class Route:
         return ctx
 
     def cache_deps(self, **loader_args):
-        return loader_args["query"]
+        query = loader_args["query"]
+        if self._query_schema is not None:
+            # so that /articles and /articles?page=1 share a key if page defaults to 1
+            return self._query_schema.without_defaults(query)
+        return query
 
     def load_data(self, **loader_args):
         return None
 
+    def cache_version(self, **loader_args):
+        return None
+
     def meta(self, **loader_args):
         return {}
 
+    def sitemap_params(self):
+        return None
+
+    def preload(self, data, **loader_args):
+        return []
+
     def parse_params(self, params):
         return params
 
     def load_form(self, form, routing_context):
-        return anvil.open_form(
+        # import the form ourselves, so that importing and constructing it are instrumented
+        form = import_form(
             form, routing_context=routing_context, **routing_context.form_properties
         )
+        return anvil.open_form(form)
 
     def get_template(self, **loader_args):
         return None
@@ -200,12 +159,20 @@ class Route:
         if cls.__dict__.get("default_not_found"):
             cls.set_default_not_found(cls)
 
+        cls._query_schema = compile_query_schema(cls.query_schema)
+
         if cls.path is None:
             return
 
         if not isinstance(cls.path, str):
             raise TypeError("path must be a string")
 
+        if cls.server_render not in ("full", "meta", "shell"):
+            raise ValueError(
+                "server_render must be one of 'full', 'meta' or 'shell',"
+                f" got {cls.server_render!r}"
+            )
+
         trimmed_path = trim_path(cls.path)
         cls.segments = Segment.from_path(trimmed_path)
         if trimmed_path.startswith("."):
@@ -216,7 +183,11 @@ class Route:
         else:
             cls.path = trimmed_path
 
-        sorted_routes.append(cls())
+        route = cls()
+        sorted_routes.append(route)
+        if cls._query_schema is not None:
+            global has_query_schemas
+            has_query_schemas = True
 
         server_fn = cls.__dict__.get("server_fn")
         existing_loader = cls.__dict__.get("load_data")
@@ -224,6 +195,11 @@ class Route:
 
             def load_data(self, **loader_args):
                 silent = loader_args.pop("silent", None)
+                fn = get_server_callable(server_fn)
+                if fn is not None:
+                    # we're serving the route from the server
+                    # so call the function directly rather than through anvil.server.call
+                    return fn(**loader_args)
                 if silent is None:
                     silent = self.server_silent
                 if silent:
@@ -234,7 +210,7 @@ class Route:
             cls.load_data = load_data
 
         if anvil.is_server_side():
-            _create_server_route(cls)
+            _create_server_route(route)
 
 
 def open_form(form, **form_properties):
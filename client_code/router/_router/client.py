@@ -9,14 +9,17 @@ from anvil.js import window
 from anvil.js.window import WeakMap, clearTimeout
 
 from .. import _navigate
-from .._cached import CACHED_FORMS
+from .._cached import CACHED_FORMS, CACHED_META, MAX_CACHED_META
 from .._context import RoutingContext
 from .._exceptions import NotFound, Redirect
+from .._import_utils import preload_module
+from .._instrumentation import event, span
 from .._loader import CACHED_DATA, load_data_promise
 from .._logger import logger
 from .._matcher import get_match, get_not_found_match
 from .._meta import update_meta_tags
 from .._navigate import navigate
+from .._route import sorted_routes
 from .._utils import (
     TIMEOUT,
     EventEmitter,
@@ -39,6 +42,8 @@ navigation_blockers = set()
 before_unload_blockers = set()
 
 form_to_context = WeakMap()
+# the form opened by the last completed navigation
+current_form = None
 
 
 def get_context(form) -> RoutingContext:
@@ -110,11 +115,73 @@ def stop_unload():
 
 
 def gc():
-    for key, cached in CACHED_DATA.copy().items():
-        if cached._should_gc():
-            logger.debug(f"releasing {key} from the cache for garbage collection")
-            CACHED_DATA.pop(key, None)
-            CACHED_FORMS.pop(key, None)
+    min_gc_time = min((route.gc_time for route in sorted_routes), default=0)
+    for key in CACHED_DATA.get_gc_keys(min_gc_time):
+        logger.debug(f"releasing {key} from the cache for garbage collection")
+        CACHED_DATA.pop(key, None)
+        CACHED_FORMS.pop(key, None)
+        CACHED_META.pop(key, None)
+
+
+def set_current_form(form, context):
+    global current_form
+    form_to_context.set(form, context)
+    current_form = form
+
+
+def can_reuse_form(prev_context, match):
+    if prev_context is None or not match.route.reuse_form:
+        return False
+    if match.error is not None:
+        # e.g. an invalid query, which shows the error form
+        return False
+    if prev_context.route is not match.route or prev_context.path != match.path:
+        return False
+    if prev_context.query == match.query and prev_context.hash == match.hash:
+        # navigating to the same location, e.g. router.reload()
+        return False
+    if prev_context.error is not None:
+        # the error form is showing
+        return False
+    return (
+        current_form is not None and form_to_context.get(current_form) is prev_context
+    )
+
+
+def _do_reuse_form(context, key_changed):
+    # the form is already open, so we only need to update its data
+    if not key_changed:
+        return
+
+    location = context.location
+    with span("data") as data_span:
+        data_promise = load_data_promise(context)
+        context.raise_event("data_loading")
+        data, error = await_promise(data_promise)
+        data_span.set(cache=context._cache_status)
+    if location.key != history.location.key:
+        logger.debug(f"stale navigation detected exiting: {location}")
+        event("stale", path=location.path)
+        return
+    if error is None:
+        # errors are passed to the context by load_data_promise
+        context.set_data(data)
+
+
+def get_meta(context):
+    route = context.route
+    key = context.match.key
+    if route.cache_meta and key in CACHED_META:
+        logger.debug(f"using cached meta for {key}")
+        return CACHED_META[key]
+
+    meta = route.meta(**context._loader_args)
+    meta = ensure_dict(meta, "meta")
+    if route.cache_meta:
+        if len(CACHED_META) >= MAX_CACHED_META:
+            CACHED_META.clear()
+        CACHED_META[key] = meta
+    return meta
 
 
 def _do_navigate(context):
@@ -126,6 +193,7 @@ def _do_navigate(context):
         stale = location.key != history.location.key
         if stale:
             logger.debug(f"stale navigation detected exiting: {location}")
+            event("stale", path=location.path)
         return stale
 
     pending_form = route.pending_form
@@ -142,33 +210,39 @@ def _do_navigate(context):
         if form is None:
             raise error
 
-        with ViewTransition():
+        with ViewTransition(route.view_transition):
             route.load_form(form, context)
 
+    if match.error is not None:
+        # e.g. an invalid query, so don't run before_load or any loaders
+        return handle_error("error_form", match.error)
+
     try:
-        nav_context = route.before_load(**context._loader_args)
+        with span("before_load"):
+            nav_context = route.before_load(**context._loader_args)
         nav_context = ensure_dict(nav_context, "before_load")
         context.nav_context.update(nav_context)
     except Redirect as r:
-        return navigate(**r.__dict__, replace=True)
+        event("redirect", path=location.path, to=r.path)
+        return navigate(
+            path=r.path,
+            query=r.query,
+            params=r.params,
+            hash=r.hash,
+            nav_context=r.nav_context,
+            form_properties=r.form_properties,
+            replace=True,
+        )
     except NotFound as e:
         return handle_error("not_found_form", e)
     except Exception as e:
         return handle_error("error_form", e)
 
     # Optimistically update meta tags before opening the form
-    meta = route.meta(**context._loader_args)
-    meta = ensure_dict(meta, "meta")
-    update_meta_tags(meta)
+    with span("meta"):
+        update_meta_tags(get_meta(context))
 
     logger.debug(f"Match key {match.key}")
-    # don't do this because it prevents reloading the same form
-    # if prev_context is not None and match.key == prev_context.match.key:
-    #     form = anvil.get_open_form()
-    #     if form is not None and form_to_context.get(form) is prev_context:
-    #         prev_context._update(context)
-    #         logger.debug(f"navigation would return the same form: {form}")
-    #         return
 
     if match.key in CACHED_FORMS:
         form = CACHED_FORMS[match.key]
@@ -179,19 +253,26 @@ def _do_navigate(context):
         RoutingContext._current = cached_context
         if anvil.get_open_form() is form:
             logger.debug(f"cached form is already open: {form}")
+            set_current_form(form, cached_context)
             return
         # TODO: update the context probably
         match.route.load_form(form, cached_context)
+        set_current_form(form, cached_context)
         return
 
     # TODO: how does cached forms work with cache modes for data?
+    # finished once the data arrives, so it includes any time showing the pending form
+    data_span = span("data")
     data_promise = load_data_promise(context)
+    data_span.set(cache=context._cache_status)
 
     try:
         result = Promise.race([data_promise, timeout(pending_delay)])
     except NotFound as e:
+        data_span.finish()
         return handle_error("not_found_form", e)
     except Exception as e:
+        data_span.finish()
         return handle_error("error_form", e)
 
     if is_stale():
@@ -202,12 +283,20 @@ def _do_navigate(context):
             f"exceeded pending delay: {pending_delay},"
             f" loading pending form {pending_form!r}"
         )
-        with ViewTransition():
+        event("pending", path=location.path, form=pending_form)
+        with ViewTransition(route.view_transition):
             route.load_form(pending_form, context)
-        sleep(pending_min)
+        # the pending form stays open until this resolves, even if the data is ready
+        min_display = timeout(pending_min)
+        if isinstance(route.form, str):
+            # import the form while we wait, rather than after the data arrives
+            preload_module(route.form)
+    else:
+        min_display = None
 
     try:
         data, error = await_promise(data_promise)
+        data_span.finish()
         context.set_data(data, error)
         # if it failed we can't be using the cached data
         if error is not None:
@@ -217,14 +306,19 @@ def _do_navigate(context):
     except Exception as e:
         return handle_error("error_form", e)
 
+    if min_display is not None:
+        # only waits for whatever is left of pending_min
+        await_promise(min_display)
+
     if is_stale():
         return
 
     form = route.form
     try:
-        with ViewTransition():
+        # swapping the pending form for the form doesn't need another transition
+        with ViewTransition(route.view_transition and min_display is None):
             rv = route.load_form(form, context)
-        form_to_context.set(rv, context)
+        set_current_form(rv, context)
         if route.cache_form:
             CACHED_FORMS[match.key] = rv
 
@@ -246,7 +340,9 @@ def on_navigate():
                 stop_unload()
                 return
 
-    match = get_match(location)
+    navigation_span = span("navigation", path=location.path)
+    with span("match"):
+        match = get_match(location)
     found = match is not None
     if not found:
         from .._route import default_not_found_route_cls
@@ -262,6 +358,13 @@ def on_navigate():
     if not found:
         context.set_data(None, NotFound(f"No match for '{location}'"))
 
+    reuse_form = found and can_reuse_form(prev_context, match)
+    if reuse_form:
+        logger.debug(f"updating the open form in place: {location}")
+        key_changed = prev_context.match.key != match.key
+        prev_context._reuse(context)
+        context = prev_context
+
     RoutingContext._current = context
 
     gc()
@@ -269,9 +372,14 @@ def on_navigate():
     kws = {**context._loader_args, "routing_context": context}
     setTimeout(lambda: navigation_emitter.raise_event("navigate", **kws))
     pending = setTimeout(lambda: navigation_emitter.raise_event("pending", **kws))
+    navigation_span.set(route=type(match.route).__name__, reuse_form=reuse_form)
     try:
-        _do_navigate(context)
+        if reuse_form:
+            _do_reuse_form(context, key_changed)
+        else:
+            _do_navigate(context)
     finally:
+        navigation_span.finish()
         clearTimeout(pending)
         setTimeout(lambda: navigation_emitter.raise_event("idle", **kws))
 
@@ -291,6 +399,8 @@ def listener(**listener_args):
             history.reload()
     else:
         current = listener_args
+        # e.g. back/forward, a debounced navigation from the previous page is out of date
+        _navigate.cancel_pending_navigation()
 
         if redirect:
             on_navigate()
@@ -308,7 +418,11 @@ def launch():
 
     if startup_data is not None:
         startup_cache = startup_data.get("cache", {})
-        CACHED_DATA.update(startup_cache)
+        if "v" in startup_cache:
+            CACHED_DATA.load_startup(startup_cache)
+        else:
+            # sent by an older version of the server
+            CACHED_DATA.update(startup_cache)
         logger.debug(f"startup data: {startup_cache}")
 
     history.listen(listener)
@@ -0,0 +1,321 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+from collections import OrderedDict
+from time import time
+
+import anvil
+
+from ._logger import logger
+
+__version__ = "0.6.1"
+
+
+class CacheBackend:
+    """Storage for the server cache
+
+    Subclass this to share cached route data between server processes.
+    get() should raise a KeyError if the key is missing or has expired.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl, tags=()):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        raise NotImplementedError
+
+    def delete_tag(self, tag):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Keeps entries in this server process, evicting the least recently used"""
+
+    def __init__(self, max_size=1000):
+        from threading import Lock
+
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            expires_at, value, tags = self._entries[key]
+            if expires_at <= time():
+                del self._entries[key]
+                raise KeyError(key)
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, tags=()):
+        with self._lock:
+            self._entries[key] = (time() + ttl, value, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _delete_where(self, predicate):
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if predicate(key, entry[2]):
+                    del self._entries[key]
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        self._delete_where(lambda key, tags: key.startswith(prefix))
+
+    def delete_tag(self, tag):
+        self._delete_where(lambda key, tags: tag in tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Keeps entries in a SQLite database that every server process can share
+
+    Values are pickled, so data loaders must return picklable data.
+    """
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tags ("
+                "tag TEXT, key TEXT, PRIMARY KEY (tag, key))"
+            )
+
+    def _connect(self):
+        import sqlite3
+
+        # a connection per call, since connections can't be shared across threads
+        return _Connection(sqlite3.connect(self.path, timeout=self.timeout))
+
+    def get(self, key):
+        import pickle
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time()),
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl, tags=()):
+        import pickle
+
+        value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (key, value, now + ttl),
+            )
+            conn.execute("DELETE FROM tags WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO tags VALUES (?, ?)", [(t, key) for t in tags]
+            )
+            # keep the database from growing with entries that will never be read
+            conn.execute(
+                "DELETE FROM tags WHERE key IN "
+                "(SELECT key FROM entries WHERE expires_at <= ?)",
+                (now,),
+            )
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.execute("DELETE FROM tags WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix):
+        where = "WHERE substr(key, 1, ?) = ?"
+        args = (len(prefix), prefix)
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM entries {where}", args)
+            conn.execute(f"DELETE FROM tags {where}", args)
+
+    def delete_tag(self, tag):
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM tags WHERE tag = ?)",
+                (tag,),
+            )
+            conn.execute("DELETE FROM tags WHERE tag = ?", (tag,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM tags")
+
+    def size(self):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM entries WHERE expires_at > ?", (time(),)
+            ).fetchone()
+        return row[0]
+
+
+class _Connection:
+    # commits on success (like sqlite3.Connection) and always closes
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc_args):
+        try:
+            return self.conn.__exit__(*exc_args)
+        finally:
+            self.conn.close()
+
+
+class _InFlight:
+    # the result of a load that other requests for the same key can wait on
+    def __init__(self):
+        from threading import Event
+
+        self.event = Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def resolve(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.event.set()
+
+
+class ServerCache:
+    """A cache for data loaded while serving public routes
+
+    Entries are stored in the backend, which defaults to a MemoryCacheBackend.
+    Concurrent requests in this process for the same key share a single load.
+    """
+
+    def __init__(self, backend=None):
+        from threading import Lock
+
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = Lock()
+
+    def get_or_load(self, key, loader, ttl, tags=()):
+        try:
+            value = self.backend.get(key)
+        except KeyError:
+            pass
+        except Exception as e:
+            logger.error(f"unable to read {key} from the server cache: {e!r}")
+        else:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                in_flight = self._in_flight[key] = _InFlight()
+                leader = True
+
+        if not leader:
+            return in_flight.wait()
+
+        try:
+            value = loader()
+        except Exception as e:
+            # errors are never cached, but anyone waiting gets the same error
+            self._resolve(key, in_flight, error=e)
+            raise
+
+        try:
+            self.backend.set(key, value, ttl, tags)
+        except Exception as e:
+            logger.error(f"unable to store {key} in the server cache: {e!r}")
+
+        self._resolve(key, in_flight, result=value)
+        return value
+
+    def _resolve(self, key, in_flight, result=None, error=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+        in_flight.resolve(result, error)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.backend.clear()
+        else:
+            self.backend.delete(key)
+
+    def invalidate_path(self, path):
+        # keys are made from the path and the cache deps, i.e. /articles:{"page": 1}
+        self.backend.delete_prefix(path + ":")
+        self.backend.delete_prefix(path.rstrip("/") + "/")
+
+    def invalidate_tag(self, tag):
+        self.backend.delete_tag(tag)
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+        stats["size"] = self.backend.size()
+        return stats
+
+
+_server_cache = ServerCache() if anvil.is_server_side() else None
+
+
+def get_server_cache():
+    if _server_cache is None:
+        raise RuntimeError("the server cache is only available on the server")
+    return _server_cache
+
+
+def use_server_cache_backend(backend):
+    if not isinstance(backend, CacheBackend):
+        raise TypeError(f"backend must be a CacheBackend, got {backend!r}")
+    get_server_cache().backend = backend
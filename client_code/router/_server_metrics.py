@@ -0,0 +1,289 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+from time import perf_counter
+
+import anvil
+
+__version__ = "0.6.1"
+
+# the phases of serving a route, in the order they appear in the Server-Timing header
+PHASES = ("match", "before_load", "meta", "data", "preload")
+
+
+class ServerTiming:
+    """Times the phases of serving a single route from the server"""
+
+    def __init__(self):
+        from threading import Lock
+
+        self.start = perf_counter()
+        self.end = None
+        self.phases = {}
+        self.route_name = None
+        # one of ok, redirect, not_modified, fallback or error
+        self.outcome = "ok"
+        self._lock = Lock()
+
+    def add(self, phase, duration):
+        with self._lock:
+            if self.end is not None:
+                # e.g. a load that finished after a fallback response
+                return
+            self.phases[phase] = self.phases.get(phase, 0) + duration
+
+    def finish(self):
+        # freeze the timing once the response is ready
+        with self._lock:
+            if self.end is None:
+                self.end = perf_counter()
+
+    def time(self, phase, fn, *args, **kws):
+        start = perf_counter()
+        try:
+            return fn(*args, **kws)
+        finally:
+            self.add(phase, perf_counter() - start)
+
+    def total(self):
+        end = perf_counter() if self.end is None else self.end
+        return end - self.start
+
+    def header(self):
+        entries = [
+            f"{phase};dur={self.phases[phase] * 1000:.1f}"
+            for phase in PHASES
+            if phase in self.phases
+        ]
+        entries.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+class Histogram:
+    """Keeps the most recent samples so that percentiles follow current behaviour"""
+
+    def __init__(self, max_samples=1000):
+        from collections import deque
+
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = max(0, -(-len(ordered) * p // 100) - 1)
+        return ordered[int(index)]
+
+    def summary(self):
+        # in milliseconds, like the Server-Timing header
+        summary = {"count": self.count}
+        for p in (50, 95, 99):
+            value = self.percentile(p)
+            summary[f"p{p}"] = None if value is None else round(value * 1000, 1)
+        return summary
+
+
+class _RouteMetrics:
+    def __init__(self, max_samples):
+        self.total = Histogram(max_samples)
+        self.phases = {phase: Histogram(max_samples) for phase in PHASES}
+        self.outcomes = {}
+
+    def record(self, timing, total):
+        self.total.add(total)
+        for phase, duration in timing.phases.items():
+            self.phases[phase].add(duration)
+        self.outcomes[timing.outcome] = self.outcomes.get(timing.outcome, 0) + 1
+
+    def summary(self):
+        return {
+            **self.total.summary(),
+            "outcomes": dict(self.outcomes),
+            "phases": {
+                phase: histogram.summary()
+                for phase, histogram in self.phases.items()
+                if histogram.count
+            },
+        }
+
+
+class ServerMetrics:
+    """Latency histograms for routes served from this server process"""
+
+    def __init__(self, max_samples=1000):
+        from threading import Lock
+
+        self.max_samples = max_samples
+        self._routes = {}
+        self._lock = Lock()
+
+    def record(self, timing):
+        timing.finish()
+        total = timing.total()
+        name = timing.route_name or "unmatched"
+        with self._lock:
+            metrics = self._routes.get(name)
+            if metrics is None:
+                metrics = self._routes[name] = _RouteMetrics(self.max_samples)
+            metrics.record(timing, total)
+
+    def get(self, route=None):
+        with self._lock:
+            if route is not None:
+                metrics = self._routes.get(route)
+                return None if metrics is None else metrics.summary()
+            return {name: metrics.summary() for name, metrics in self._routes.items()}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+# the most samples accepted in a single batch from a client
+MAX_CLIENT_BATCH = 500
+
+
+class _ClientRouteMetrics:
+    def __init__(self, max_samples):
+        self.total = Histogram(max_samples)
+        self.phases = {}
+        self.max_samples = max_samples
+        self.cache = {}
+
+    def record(self, sample):
+        self.total.add(sample["total"] / 1000)
+        for phase, duration in sample["phases"].items():
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = Histogram(self.max_samples)
+            histogram.add(duration / 1000)
+        status = sample["cache"]
+        if status is not None:
+            self.cache[status] = self.cache.get(status, 0) + 1
+
+    def summary(self):
+        loads = sum(self.cache.values())
+        from_cache = self.cache.get("hit", 0) + self.cache.get("swr", 0)
+        return {
+            **self.total.summary(),
+            "cache": dict(self.cache),
+            "hit_ratio": round(from_cache / loads, 3) if loads else None,
+            "phases": {
+                phase: histogram.summary() for phase, histogram in self.phases.items()
+            },
+        }
+
+
+def _clean_sample(sample):
+    # samples come from the client, so don't trust them
+    if not isinstance(sample, dict):
+        return None
+    route, total, phases = (
+        sample.get("route"),
+        sample.get("total"),
+        sample.get("phases"),
+    )
+    if not isinstance(route, str) or not isinstance(total, (int, float)):
+        return None
+    if not isinstance(phases, dict):
+        phases = {}
+    phases = {
+        phase: duration
+        for phase, duration in phases.items()
+        if isinstance(phase, str) and isinstance(duration, (int, float))
+    }
+    cache = sample.get("cache")
+    if cache not in ("hit", "miss", "swr", "dedupe"):
+        cache = None
+    return {"route": route, "total": total, "phases": phases, "cache": cache}
+
+
+class ClientMetrics:
+    """Navigation timings sent from clients, see enable_client_metrics"""
+
+    def __init__(self, max_samples=1000, max_routes=500):
+        from threading import Lock
+
+        self.max_samples = max_samples
+        self.max_routes = max_routes
+        self._routes = {}
+        self._lock = Lock()
+
+    def record(self, batch):
+        if not isinstance(batch, dict) or not isinstance(batch.get("samples"), list):
+            raise TypeError("expected a batch of samples from enable_client_metrics")
+        samples = [_clean_sample(s) for s in batch["samples"][:MAX_CLIENT_BATCH]]
+        with self._lock:
+            for sample in samples:
+                if sample is None:
+                    continue
+                name = sample["route"]
+                metrics = self._routes.get(name)
+                if metrics is None:
+                    if len(self._routes) >= self.max_routes:
+                        continue
+                    metrics = self._routes[name] = _ClientRouteMetrics(self.max_samples)
+                metrics.record(sample)
+
+    def get(self, route=None):
+        with self._lock:
+            if route is not None:
+                metrics = self._routes.get(route)
+                return None if metrics is None else metrics.summary()
+            return {name: metrics.summary() for name, metrics in self._routes.items()}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+_server_metrics = ServerMetrics() if anvil.is_server_side() else None
+_client_metrics = ClientMetrics() if anvil.is_server_side() else None
+
+
+def _get_server_metrics():
+    if _server_metrics is None:
+        raise RuntimeError("server metrics are only available on the server")
+    return _server_metrics
+
+
+def get_server_metrics(route=None):
+    """Latency percentiles in milliseconds for routes served from the server
+
+    Keyed by route class name. Pass a route class name to get a single route.
+    """
+    return _get_server_metrics().get(route)
+
+
+def reset_server_metrics():
+    _get_server_metrics().reset()
+
+
+def _get_client_metrics():
+    if _client_metrics is None:
+        raise RuntimeError("client metrics are only available on the server")
+    return _client_metrics
+
+
+def record_client_metrics(batch):
+    """Adds a batch of navigation timings sent by enable_client_metrics"""
+    _get_client_metrics().record(batch)
+
+
+def get_client_metrics(route=None):
+    """Latency percentiles in milliseconds for navigations on the client
+
+    Keyed by route class name. Pass a route class name to get a single route.
+    Only includes batches recorded by this server process, so the metrics are only
+    complete on a single persistent server process.
+    """
+    return _get_client_metrics().get(route)
+
+
+def reset_client_metrics():
+    _get_client_metrics().reset()
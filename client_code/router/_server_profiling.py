@@ -0,0 +1,159 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+from time import time
+
+from ._logger import logger
+
+__version__ = "0.6.1"
+
+
+class _ProfilingConfig:
+    def __init__(self, threshold, sample_rate, directory, max_files):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.max_files = max_files
+
+
+_config = None
+
+
+def enable_profiling(threshold=None, sample_rate=0, directory=None, max_files=100):
+    """Profile routes served from the server with cProfile
+
+    Requests slower than threshold seconds are saved, as is a sample_rate fraction
+    of all requests. Profiles are saved as pstats files in directory, keeping the
+    most recent max_files.
+    """
+    import os
+    import tempfile
+
+    if threshold is None and not sample_rate:
+        raise ValueError("enable_profiling needs a threshold or a sample_rate")
+    if directory is None:
+        directory = os.path.join(tempfile.gettempdir(), "routing-profiles")
+    os.makedirs(directory, exist_ok=True)
+
+    global _config
+    _config = _ProfilingConfig(threshold, sample_rate, directory, max_files)
+    logger.debug(f"profiling server routes, saving to {directory}")
+
+
+def disable_profiling():
+    global _config
+    _config = None
+
+
+def start_profile():
+    # returns a profiler if this request should be profiled
+    config = _config
+    if config is None:
+        return None
+
+    from random import random
+
+    sampled = bool(config.sample_rate) and random() < config.sample_rate
+    # we can't know in advance if a request will be slow, so profile all of them
+    if not sampled and config.threshold is None:
+        return None
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # another profiler is already running, e.g. for a concurrent request
+        return None
+    profiler.sampled = sampled
+    profiler.config = config
+    return profiler
+
+
+def finish_profile(profiler, route_name, duration):
+    profiler.disable()
+    config = profiler.config
+    threshold = config.threshold
+    if not profiler.sampled and (threshold is None or duration < threshold):
+        return None
+
+    import os
+
+    name = f"{route_name or 'unmatched'}-{int(time() * 1000)}-{int(duration * 1000)}ms"
+    path = os.path.join(config.directory, name + ".prof")
+    try:
+        profiler.dump_stats(path)
+        _remove_old_profiles(config)
+    except OSError as e:
+        logger.error(f"unable to save profile for {route_name}: {e!r}")
+        return None
+    logger.debug(f"{route_name}: saved profile to {path}")
+    return path
+
+
+def _list_profiles(directory):
+    import os
+
+    paths = [
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith(".prof")
+    ]
+    return sorted(paths, key=os.path.getmtime)
+
+
+def _remove_old_profiles(config):
+    import os
+
+    paths = _list_profiles(config.directory)
+    for path in paths[: max(len(paths) - config.max_files, 0)]:
+        try:
+            os.remove(path)
+        except OSError:
+            # probably removed by another request
+            pass
+
+
+def _route_name(path):
+    import os
+
+    # RouteName-timestamp-duration.prof
+    return os.path.basename(path).rsplit("-", 2)[0]
+
+
+def summarize_profiles(route=None, limit=10, directory=None):
+    """The functions with the highest cumulative time in the saved profiles
+
+    Returns a dict keyed by route class name. Each value has the number of
+    profiles and a list of the top hotspots across them.
+    """
+    import pstats
+
+    if directory is None:
+        if _config is None:
+            raise RuntimeError("profiling is not enabled, pass a directory")
+        directory = _config.directory
+
+    by_route = {}
+    for path in _list_profiles(directory):
+        name = _route_name(path)
+        if route is None or name == route:
+            by_route.setdefault(name, []).append(path)
+
+    summary = {}
+    for name, paths in by_route.items():
+        stats = pstats.Stats(*paths)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        hotspots = []
+        for (filename, line, function), (cc, nc, tt, ct, callers) in rows[:limit]:
+            hotspots.append(
+                {
+                    "function": f"{filename}:{line}({function})",
+                    "calls": nc,
+                    "total_time": round(tt, 6),
+                    "cumulative_time": round(ct, 6),
+                }
+            )
+        summary[name] = {"profiles": len(paths), "hotspots": hotspots}
+    return summary
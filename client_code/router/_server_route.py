@@ -0,0 +1,592 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+import hashlib
+import json
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import BoundedSemaphore, Lock
+from time import monotonic, perf_counter
+
+import anvil.server
+from anvil.history import Location
+from anvil.server import AppResponder
+
+from ._cached import RequestCache, get_request_cache
+from ._config import get_routing_config
+from ._constants import NO_CACHE
+from ._context import RoutingContext
+from ._exceptions import Redirect
+from ._loader import CachedData, encode_startup_cache
+from ._logger import logger
+from ._matcher import (
+    get_match,
+    get_match_from_nav_args,
+    get_route_match,
+    get_segments,
+    match_segments,
+)
+from ._navigate import nav_args_to_location
+from ._server_cache import get_server_cache
+from ._server_metrics import ServerTiming, _get_server_metrics
+from ._server_profiling import finish_profile, start_profile
+from ._utils import default_hook, encode_query_params, ensure_dict, trim_path
+
+__version__ = "0.6.1"
+
+_config = get_routing_config()
+# used by routes that load meta in parallel with data
+_executor = ThreadPoolExecutor(
+    max_workers=int(_config["server_workers"]), thread_name_prefix="routing"
+)
+# data loads for routes with a server_timeout, and preloads, can outlive the request,
+# so they get their own pools and never queue, otherwise slow loads would block other requests
+_timeout_workers = int(_config["server_timeout_workers"])
+_timeout_executor = ThreadPoolExecutor(
+    max_workers=_timeout_workers, thread_name_prefix="routing-timeout"
+)
+_timeout_slots = BoundedSemaphore(_timeout_workers)
+_preload_workers = int(_config["server_preload_workers"])
+_preload_executor = ThreadPoolExecutor(
+    max_workers=_preload_workers, thread_name_prefix="routing-preload"
+)
+_preload_slots = BoundedSemaphore(_preload_workers)
+
+# how many redirects we follow before sending the client to the last one
+MAX_REDIRECTS = 5
+
+# permanent redirects we've already followed, keyed by the requested url
+MAX_PERMANENT_REDIRECTS = 1000
+_permanent_redirects = OrderedDict()
+_redirects_lock = Lock()
+
+
+def load_app(cache, meta=None):
+    data = {"cache": encode_startup_cache(cache)}
+    return AppResponder(data=data, meta=meta).load_app()
+
+
+def make_cached_data(match, data):
+    route = match.route
+    return CachedData(
+        data=data, location=match.location, mode=route.cache_data, gc_time=route.gc_time
+    )
+
+
+def load_data(match, loader_args):
+    # returns the CachedData to send to the client
+    route = match.route
+    if not route.public or not route.server_cache_time or route.cache_data == NO_CACHE:
+        return make_cached_data(match, route.load_data(**loader_args))
+
+    # public data is the same for every user
+    # so concurrent and repeated requests can share a single load
+    def loader():
+        # keep data from ensure_data with the result, so a hit sends the same as a miss
+        ensured = {}
+        with RequestCache(ensured):
+            data = route.load_data(**loader_args)
+        return make_cached_data(match, data), ensured
+
+    # tagged with the route name so that all of a route's data can be invalidated
+    tags = [type(route).__name__]
+    ttl = route.server_cache_time
+    # cached data keeps the time it was loaded, so the client knows how old it is
+    cached, ensured = get_server_cache().get_or_load(match.key, loader, ttl, tags)
+    request_cache = get_request_cache()
+    if request_cache is not None:
+        request_cache.update(ensured)
+    return cached
+
+
+def serve_route(route, request, **kwargs):
+    timing = ServerTiming()
+    profiler = start_profile()
+    try:
+        # each request gets its own cache so that data from other requests
+        # (and other users) is never sent to the client
+        with RequestCache() as cache:
+            response = _serve_route(route, request, cache, timing)
+    except Exception:
+        timing.outcome = "error"
+        raise
+    finally:
+        # tasks from a fallback can still be running, so stop recording them
+        timing.finish()
+        if profiler is not None:
+            finish_profile(profiler, timing.route_name, timing.total())
+        _get_server_metrics().record(timing)
+
+    return with_header(response, "Server-Timing", timing.header())
+
+
+def with_header(response, name, value):
+    if not isinstance(response, anvil.server.HttpResponse):
+        response = anvil.server.HttpResponse(status=200, body=response)
+    response.headers[name] = value
+    return response
+
+
+def get_preload_match(target):
+    if isinstance(target, str):
+        return get_match_from_nav_args(
+            target, path=None, query=None, params=None, hash=None
+        )
+    return get_match_from_nav_args(
+        None,
+        path=target["path"],
+        query=target.get("query"),
+        params=target.get("params"),
+        hash=None,
+    )
+
+
+def load_preload_data(match):
+    context = RoutingContext(match=match)
+    run_before_load(context)
+    return load_data(match, context._loader_args)
+
+
+def preload(route, data, loader_args, cache, deadline):
+    # load data for the routes the user is likely to visit next
+    # so that their first navigation doesn't need a server call
+    try:
+        targets = route.preload(data, **loader_args)
+    except Exception as e:
+        logger.error(f"error getting preload targets for {route.path}: {e!r}")
+        return
+    if not targets:
+        return
+
+    pending = {}
+    for target in targets:
+        try:
+            match = get_preload_match(target)
+        except Exception as e:
+            logger.error(f"unable to preload {target!r}: {e!r}")
+            continue
+        key = match.key
+        if key in cache or key in pending or match.route.server_render != "full":
+            continue
+        future = submit_bounded(
+            _preload_executor, _preload_slots, load_preload_data, match
+        )
+        if future is None:
+            logger.debug(f"every preload worker is busy, not preloading {key}")
+            break
+        pending[key] = match, future
+
+    if not pending:
+        return
+
+    budget = route.server_preload_time
+    if deadline is not None:
+        budget = max(min(budget, deadline - monotonic()), 0)
+    wait([future for _, future in pending.values()], timeout=budget)
+
+    for key, (match, future) in pending.items():
+        if not future.done():
+            logger.debug(f"{key} not preloaded after {budget}s")
+            continue
+        try:
+            cache[key] = get_result(future, cache)
+        except Exception as e:
+            # including redirects, the client will handle these when it navigates
+            logger.debug(f"{key} not preloaded: {e!r}")
+            continue
+
+
+def get_permanent_redirect(url):
+    with _redirects_lock:
+        target = _permanent_redirects.get(url)
+        if target is not None:
+            _permanent_redirects.move_to_end(url)
+        return target
+
+
+def add_permanent_redirect(url, target):
+    with _redirects_lock:
+        _permanent_redirects[url] = target
+        _permanent_redirects.move_to_end(url)
+        while len(_permanent_redirects) > MAX_PERMANENT_REDIRECTS:
+            _permanent_redirects.popitem(last=False)
+
+
+def clear_permanent_redirects():
+    with _redirects_lock:
+        _permanent_redirects.clear()
+
+
+def redirect(url, permanent=False):
+    status = 301 if permanent else 302
+    return anvil.server.HttpResponse(status=status, headers={"Location": url})
+
+
+def redirect_to_location(r, location):
+    return nav_args_to_location(
+        path=location.path if r.path is None else r.path,
+        query=r.query,
+        params=r.params,
+        hash=r.hash,
+    )
+
+
+def run_before_load(context):
+    nav_context = context.route.before_load(**context._loader_args)
+    nav_context = ensure_dict(nav_context, "before_load")
+    context.nav_context.update(nav_context)
+
+
+def follow_redirects(r, location):
+    # follow the chain here so that the client only makes a single round trip
+    # the chain is only permanent if every redirect in it is permanent
+    permanent = r.permanent
+    location = redirect_to_location(r, location)
+    seen = set()
+    for _ in range(MAX_REDIRECTS):
+        url = location.get_url(False)
+        if url in seen:
+            logger.warning(f"redirect loop at {location}")
+            break
+        seen.add(url)
+
+        match = get_match(location)
+        if match is None or match.route.server_render == "shell":
+            break
+        try:
+            run_before_load(RoutingContext(match=match))
+        except Redirect as r:
+            permanent = permanent and r.permanent
+            location = redirect_to_location(r, location)
+        except Exception:
+            # this route will handle its own error when the client requests it
+            break
+        else:
+            break
+    else:
+        logger.warning(f"more than {MAX_REDIRECTS} redirects, stopping at {location}")
+
+    return location, permanent
+
+
+def fingerprint(data, meta):
+    try:
+        content = json.dumps([data, meta], sort_keys=True, default=default_hook)
+    except Exception:
+        # e.g. data table rows, which we can't fingerprint cheaply
+        return None
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def make_etag(key, version):
+    if version is None:
+        return None
+    digest = hashlib.sha1(f"{key}:{version}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    headers = getattr(request, "headers", None) or {}
+    if_none_match = headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    etags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in etags or "*" in etags
+
+
+def get_cache_headers(route, etag):
+    visibility = "public" if route.public else "private"
+    cache_control = (
+        f"{visibility}, max-age={int(route.stale_time)},"
+        f" stale-while-revalidate={int(route.gc_time)}"
+    )
+    headers = {"Cache-Control": cache_control}
+    if etag is not None:
+        headers["ETag"] = etag
+    return headers
+
+
+def not_modified(route, etag):
+    headers = get_cache_headers(route, etag)
+    return anvil.server.HttpResponse(status=304, headers=headers)
+
+
+def get_meta(route, loader_args, location):
+    try:
+        return route.meta(**loader_args)
+    except Exception as e:
+        logger.error(
+            f"error getting meta data for {location}: got {e!r}\n"
+            f"{traceback.format_exc()}"
+        )
+        return None
+
+
+def get_cache_version(route, loader_args, location):
+    try:
+        return route.cache_version(**loader_args)
+    except Exception as e:
+        # the etag will be a fingerprint of the data and meta instead
+        logger.error(
+            f"error getting cache version for {location}: got {e!r}\n"
+            f"{traceback.format_exc()}"
+        )
+        return None
+
+
+def get_thread_locals():
+    # anvil keeps the session, the call context and the http request in thread locals
+    # so that get_user, anvil.server.session etc. work for the current request
+    try:
+        from anvil import _threaded_server
+    except ImportError:
+        return []
+    thread_locals = [
+        _threaded_server.call_info,
+        _threaded_server.call_context,
+        getattr(anvil.server, "request", None),
+    ]
+    return [local for local in thread_locals if isinstance(local, threading.local)]
+
+
+class CallState:
+    """The request thread's anvil state, restored in the pool thread running a task"""
+
+    def __init__(self):
+        self.state = [(local, dict(local.__dict__)) for local in get_thread_locals()]
+        self.saved = []
+
+    def __enter__(self):
+        # pool threads are reused, so put back their own state afterwards
+        self.saved = [(local, dict(local.__dict__)) for local, _ in self.state]
+        for local, state in self.state:
+            local.__dict__.clear()
+            local.__dict__.update(state)
+        return self
+
+    def __exit__(self, *exc_args):
+        for local, state in self.saved:
+            local.__dict__.clear()
+            local.__dict__.update(state)
+        self.saved = []
+        return False
+
+
+def make_task(fn, args):
+    # the task's cache and time are only used if its result is used in time,
+    # the task can outlive the request so it must not touch the request's timing
+    task_cache = {}
+    task_time = {}
+    call_state = CallState()
+
+    def task():
+        start = perf_counter()
+        try:
+            with call_state, RequestCache(task_cache):
+                return fn(*args)
+        finally:
+            task_time["duration"] = perf_counter() - start
+
+    return task, task_cache, task_time
+
+
+def submit(fn, *args):
+    task, task_cache, task_time = make_task(fn, args)
+    future = _executor.submit(task)
+    future.cache, future.time = task_cache, task_time
+    return future
+
+
+def submit_bounded(executor, slots, fn, *args):
+    # returns None when every worker is busy with tasks that haven't finished
+    if not slots.acquire(blocking=False):
+        return None
+    task, task_cache, task_time = make_task(fn, args)
+
+    def release_slot_after():
+        try:
+            return task()
+        finally:
+            slots.release()
+
+    try:
+        future = executor.submit(release_slot_after)
+    except Exception:
+        slots.release()
+        raise
+    future.cache, future.time = task_cache, task_time
+    return future
+
+
+def get_result(future, cache, timing=None, phase=None):
+    if timing is not None:
+        timing.add(phase, future.time.get("duration", 0))
+    result = future.result()
+    cache.update(future.cache)
+    return result
+
+
+def _serve_route(route, request, cache, timing):
+    path = request.path
+    search = encode_query_params(request.query_params)
+    location = Location(path=path, search=search, key="default")
+    logger.debug(f"serving route from the server: {location}")
+
+    target = get_permanent_redirect(location.get_url(False))
+    if target is not None:
+        logger.debug(f"{location}: permanently redirected to {target}")
+        timing.outcome = "redirect"
+        return redirect(target, permanent=True)
+
+    match_start = perf_counter()
+    # anvil has already matched this route, so avoid checking every route
+    params = match_segments(route, get_segments(trim_path(location.path)))
+    if params is not None:
+        timing.route_name = type(route).__name__
+        if route.server_render == "shell":
+            return load_app(cache)
+        match = get_route_match(location, route, params)
+    else:
+        # the http router is less strict, e.g. /articles also matches /articles/123
+        logger.debug(f"{location} does not fit {route.path}, matching all routes")
+        match = get_match(location)
+        if match is None:
+            # this shouldn't happen
+            raise Exception(f"No match for '{location}'")
+        timing.route_name = type(match.route).__name__
+        if match.route.server_render == "shell":
+            return load_app(cache)
+    timing.add("match", perf_counter() - match_start)
+
+    route = match.route
+    context = RoutingContext(match=match)
+
+    if match.error is not None:
+        # the client will show the error
+        logger.warning(f"{location}: {match.error!r}")
+        timing.outcome = "error"
+        return load_app(cache)
+
+    if route.server_render == "meta":
+        meta = timing.time("meta", get_meta, route, context._loader_args, location)
+        return load_app(cache, meta)
+
+    timeout = route.server_timeout
+    deadline = None if timeout is None else monotonic() + timeout
+
+    meta_future = None
+    if route.server_parallel_meta:
+        # the route has told us meta doesn't depend on before_load
+        meta_args = {**context._loader_args, "nav_context": {}}
+        meta_future = submit(get_meta, route, meta_args, location)
+
+    try:
+        timing.time("before_load", run_before_load, context)
+    except Redirect as r:
+        target, permanent = timing.time("before_load", follow_redirects, r, location)
+        logger.debug(f"redirecting to {target}")
+        url = target.get_url(True)
+        if permanent:
+            add_permanent_redirect(location.get_url(False), url)
+        timing.outcome = "redirect"
+        return redirect(url, permanent)
+    except Exception as e:
+        # TODO: handle error on the client
+        logger.error(
+            f"{location}: error serving route from the server: {e!r}\n"
+            f"{traceback.format_exc()}"
+        )
+        timing.outcome = "error"
+        return load_app(cache)
+
+    etag = None
+    if route.http_cache:
+        version = get_cache_version(route, context._loader_args, location)
+        if version is not None:
+            etag = make_etag(match.key, version)
+            if etag_matches(request, etag):
+                # the client already has this version, so skip loading the data
+                logger.debug(f"{location}: not modified")
+                timing.outcome = "not_modified"
+                return not_modified(route, etag)
+
+    if meta_future is None:
+        meta = timing.time("meta", get_meta, route, context._loader_args, location)
+
+    # no worker was free for a load with a timeout
+    saturated = False
+    data_future = None
+    data_error = None
+    if deadline is not None:
+        data_future = submit_bounded(
+            _timeout_executor, _timeout_slots, load_data, match, context._loader_args
+        )
+        saturated = data_future is None
+        futures = [f for f in (meta_future, data_future) if f is not None]
+        wait(futures, timeout=max(deadline - monotonic(), 0))
+    elif meta_future is not None:
+        # only meta goes to the pool, data loads on this thread at the same time
+        try:
+            cached_data = timing.time("data", load_data, match, context._loader_args)
+        except Exception as e:
+            data_error = e
+        wait([meta_future])
+
+    if meta_future is not None:
+        if meta_future.done():
+            meta = get_result(meta_future, cache, timing, "meta")
+        else:
+            logger.warning(f"{location}: meta not ready after {timeout}s")
+            meta = None
+
+    if saturated:
+        logger.warning(
+            f"{location}: every timeout worker is busy, sending the page without data"
+        )
+        timing.outcome = "fallback"
+        return load_app(cache, meta)
+
+    if data_future is not None and not data_future.done():
+        # send the page now, the client will load the data
+        logger.warning(
+            f"{location}: data not ready after {timeout}s, sending the page without data"
+        )
+        data_future.add_done_callback(
+            lambda f: logger.debug(f"{location}: discarded data that loaded too late")
+        )
+        timing.outcome = "fallback"
+        return load_app(cache, meta)
+
+    try:
+        if data_error is not None:
+            raise data_error
+        if data_future is not None:
+            cached_data = get_result(data_future, cache, timing, "data")
+        elif meta_future is None:
+            cached_data = timing.time("data", load_data, match, context._loader_args)
+    except Exception as e:
+        logger.error(
+            f"error loading data for {location}, got {e!r}\n{traceback.format_exc()}"
+        )
+        # TODO: handle error on the client
+        timing.outcome = "error"
+        return load_app(cache, meta)
+
+    data = cached_data.data
+    cache[match.key] = cached_data
+
+    timing.time("preload", preload, route, data, context._loader_args, cache, deadline)
+
+    response = load_app(cache, meta)
+    if not route.http_cache:
+        return response
+
+    if etag is None:
+        etag = make_etag(match.key, fingerprint(data, meta))
+    if etag is not None and etag_matches(request, etag):
+        timing.outcome = "not_modified"
+        return not_modified(route, etag)
+    headers = get_cache_headers(route, etag)
+    return anvil.server.HttpResponse(status=200, body=response, headers=headers)
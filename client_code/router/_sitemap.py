@@ -0,0 +1,139 @@
+# Copyright (c) 2026 Anvil
+# SPDX-License-Identifier: MIT
+
+import hashlib
+from itertools import islice
+from xml.sax.saxutils import escape
+
+import anvil.server
+
+from ._exceptions import InvalidPathParams
+from ._logger import logger
+from ._navigate import clean_path
+from ._route import sorted_routes
+from ._server_cache import MemoryCacheBackend, ServerCache
+from ._server_route import etag_matches
+
+__version__ = "0.6.1"
+
+# the most urls allowed in a single sitemap file
+# https://developers.google.com/search/docs/crawling-indexing/sitemaps/large-sitemaps
+MAX_URLS = 50_000
+
+# used to invalidate everything the sitemap has cached
+SITEMAP_TAG = "sitemap"
+
+# the sitemap has its own cache in each server process,
+# so route data can't evict it and the shards are never pickled
+_sitemap_cache = ServerCache(MemoryCacheBackend(max_size=2))
+
+
+def get_sitemap_cache():
+    return _sitemap_cache
+
+
+def get_route_paths(route):
+    if not route.sitemap or not route.path:
+        return
+
+    all_params = route.sitemap_params()
+    if all_params is None:
+        if any(segment.is_param() for segment in route.segments):
+            logger.debug(f"{route.path} has no sitemap_params, skipping")
+            return
+        yield route.path
+        return
+
+    for params in all_params:
+        try:
+            yield clean_path(route.path, params)
+        except InvalidPathParams as e:
+            logger.error(f"{route.path}: invalid sitemap params {params!r}, {e}")
+
+
+def iter_urls(origin):
+    # I don't really know if this bare url is necessary, but what's the harm?
+    yield origin
+    for route in sorted_routes:
+        for path in get_route_paths(route):
+            yield origin + path
+
+
+def make_etag(content):
+    return '"' + hashlib.sha1(content).hexdigest() + '"'
+
+
+def generate_shards():
+    # the urls are enumerated once for every shard
+    origin = anvil.server.get_app_origin()
+    urls = iter_urls(origin)
+    shards = []
+    while True:
+        chunk = list(islice(urls, MAX_URLS))
+        if not chunk:
+            return shards
+        content = "\n".join(chunk).encode()
+        shards.append((content, make_etag(content)))
+
+
+def get_shards(ttl):
+    return get_sitemap_cache().get_or_load(
+        "sitemap:shards", generate_shards, ttl, tags=[SITEMAP_TAG]
+    )
+
+
+def get_shard_count(ttl):
+    return len(get_shards(ttl))
+
+
+def get_shard(shard, ttl):
+    return get_shards(ttl)[shard]
+
+
+def get_index(ttl):
+    def generate():
+        origin = anvil.server.get_app_origin()
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        ]
+        for shard in range(get_shard_count(ttl)):
+            loc = escape(f"{origin}/sitemap/{shard}")
+            lines.append(f"  <sitemap><loc>{loc}</loc></sitemap>")
+        lines.append("</sitemapindex>")
+        content = "\n".join(lines).encode()
+        return content, make_etag(content)
+
+    return get_sitemap_cache().get_or_load(
+        "sitemap:index", generate, ttl, tags=[SITEMAP_TAG]
+    )
+
+
+def is_sharded(ttl):
+    return get_shard_count(ttl) > 1
+
+
+def serve(request, content, etag, content_type, name, ttl):
+    headers = {"Cache-Control": f"public, max-age={int(ttl)}", "ETag": etag}
+    if etag_matches(request, etag):
+        return anvil.server.HttpResponse(status=304, headers=headers)
+
+    file = anvil.BlobMedia(content_type=content_type, content=content, name=name)
+    return anvil.server.HttpResponse(status=200, body=file, headers=headers)
+
+
+def serve_shard(request, shard, ttl):
+    try:
+        shard = int(shard)
+    except (TypeError, ValueError):
+        return anvil.server.HttpResponse(status=404)
+    if shard < 0 or shard >= get_shard_count(ttl):
+        return anvil.server.HttpResponse(status=404)
+
+    content, etag = get_shard(shard, ttl)
+    return serve(request, content, etag, "text/plain", f"sitemap-{shard}.txt", ttl)
+
+
+def serve_index(request, ttl):
+    content, etag = get_index(ttl)
+    return serve(request, content, etag, "application/xml", "sitemap-index.xml", ttl)
@@ -3,6 +3,7 @@
 
 # ruff:noqa: F401
 import json
+import re
 from datetime import date, datetime
 
 import anvil
@@ -15,8 +16,13 @@ if anvil.is_server_side():
     from .server import (
         Promise,
         await_promise,
+        clearTimeout,
+        compress_text,
+        decompress_text,
         document,
         encode_query_params,
+        get_server_callable,
+        now,
         report_exceptions,
         setTimeout,
         timeout,
@@ -40,8 +46,13 @@ else:
     from .client import (
         Promise,
         await_promise,
+        clearTimeout,
+        compress_text,
+        decompress_text,
         document,
         encode_query_params,
+        get_server_callable,
+        now,
         report_exceptions,
         setTimeout,
         timeout,
@@ -126,6 +137,22 @@ def object_hook(obj):
     return deserializer(obj[key])
 
 
+_JSON_NUMBER = re.compile(r"-?(0|[1-9][0-9]*)(\.[0-9]+)?([eE][-+]?[0-9]+)?$")
+_JSON_WORDS = {"true", "false", "null", "NaN", "Infinity", "-Infinity"}
+
+
+def maybe_json(s):
+    # False when loads(s) would fail, which is cheaper than catching the exception
+    s = s.strip(" \t\n\r")
+    if not s:
+        return False
+    if s[0] in '{["':
+        return True
+    if s in _JSON_WORDS:
+        return True
+    return _JSON_NUMBER.match(s) is not None
+
+
 def dumps(obj):
     return json.dumps(obj, sort_keys=True, default=dumps)
 
@@ -7,7 +7,14 @@ from anvil.js import (
     await_promise,
     report_exceptions,
 )
-from anvil.js.window import Promise, URLSearchParams, document, setTimeout
+from anvil.js.window import (
+    Promise,
+    URLSearchParams,
+    clearTimeout,
+    document,
+    performance,
+    setTimeout,
+)
 
 from .._constants import TIMEOUT
 
@@ -29,6 +36,10 @@ else:
     pass
 
 
+def get_server_callable(name):
+    return None
+
+
 def timeout(s=0):
     def wait_async(resolve, reject):
         def timeout():
@@ -39,6 +50,30 @@ def timeout(s=0):
     return Promise(wait_async)
 
 
+def now():
+    # milliseconds, on the same clock as performance.mark
+    return performance.now()
+
+
+def compress_text(text):
+    # url safe base64 of the raw deflated text
+    from anvil.js.window import Blob, CompressionStream, Response, Uint8Array, btoa
+
+    stream = Blob([text]).stream().pipeThrough(CompressionStream("deflate-raw"))
+    data = Uint8Array(Response(stream).arrayBuffer())
+    binary = "".join(chr(b) for b in data)
+    return btoa(binary).replace("+", "-").replace("/", "_").rstrip("=")
+
+
+def decompress_text(value):
+    from anvil.js.window import Blob, DecompressionStream, Response, Uint8Array, atob
+
+    value = value.replace("-", "+").replace("_", "/") + "=" * (-len(value) % 4)
+    data = Uint8Array([ord(c) for c in atob(value)])
+    stream = Blob([data]).stream().pipeThrough(DecompressionStream("deflate-raw"))
+    return Response(stream).text()
+
+
 def encode_query_params(query):
     if not query:
         return ""
@@ -2,6 +2,7 @@
 # SPDX-License-Identifier: MIT
 
 # ruff: noqa: F401
+from time import perf_counter
 from urllib.parse import urlencode
 
 __version__ = "0.6.1"
@@ -106,6 +107,15 @@ def await_promise(promise):
     return promise.get()
 
 
+def get_server_callable(name):
+    # the function registered with @anvil.server.callable, including any require_user check
+    try:
+        from anvil._server import registrations
+    except ImportError:
+        return None
+    return registrations.get(name)
+
+
 def report_exceptions(fn):
     return fn
 
@@ -118,6 +128,33 @@ def setTimeout(fn, ms):
     fn()
 
 
+def clearTimeout(handle):
+    pass
+
+
+def now():
+    # milliseconds, like performance.now() on the client
+    return perf_counter() * 1000
+
+
+def compress_text(text):
+    # raw deflate, to match CompressionStream("deflate-raw") on the client
+    import base64
+    import zlib
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    data = compressor.compress(text.encode()) + compressor.flush()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decompress_text(value):
+    import base64
+    import zlib
+
+    data = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    return zlib.decompress(data, -15).decode()
+
+
 def encode_query_params(query):
     if not query:
         return ""
@@ -1,11 +1,11 @@
 # Copyright (c) 2024-2026 Anvil
 # SPDX-License-Identifier: MIT
 
-from time import sleep
-
+from ._constants import TIMEOUT
+from ._instrumentation import span
 from ._logger import logger
 from ._non_blocking import Deferred
-from ._utils import await_promise, document, setTimeout
+from ._utils import Promise, await_promise, document, now, setTimeout, timeout
 
 __version__ = "0.6.1"
 
@@ -13,22 +13,63 @@ _transition = None
 _can_transition = hasattr(document, "startViewTransition")
 _use_transition = True
 
+# navigations closer together than this (in seconds) skip the transition
+# e.g. rapid back/forward, where animating every step only slows things down
+RAPID_NAVIGATION = 0.3
+# the longest we'll freeze the old view while the new form loads
+MAX_TRANSITION_WAIT = 0.1
+
+_last_started = None
+_reduced_motion = None
+
 
 def use_transitions(can_transition=True):
     global _use_transition
     _use_transition = can_transition
 
 
+def _prefers_reduced_motion():
+    global _reduced_motion
+    if _reduced_motion is None:
+        try:
+            from anvil.js.window import matchMedia
+
+            _reduced_motion = matchMedia("(prefers-reduced-motion: reduce)")
+        except Exception:
+            _reduced_motion = False
+    # the media query list updates if the user changes their settings
+    return bool(_reduced_motion) and bool(_reduced_motion.matches)
+
+
+def _is_rapid():
+    global _last_started
+    started = now()
+    rapid = (
+        _last_started is not None and started - _last_started < RAPID_NAVIGATION * 1000
+    )
+    _last_started = started
+    return rapid
+
+
 class ViewTransition:
-    def __init__(self):
+    def __init__(self, enabled=True):
+        self.enabled = enabled
         self.deferred = Deferred()
+        # resolved once the browser has captured the old view
+        self.captured = Deferred()
         self.transition = None
-        self.promise_callback = lambda: self.deferred.promise
+        self.span = None
+
+    def promise_callback(self):
+        self.captured.resolve(None)
+        return self.deferred.promise
 
     def resolve(self):
         global _transition
         if _transition is self.transition:
             _transition = None
+        if self.span is not None:
+            self.span.finish()
         self.deferred.resolve(None)
 
     def _observe_ready(self):
@@ -40,17 +81,34 @@ class ViewTransition:
         except Exception as e:
             logger.debug(f"View transition ready rejected: {e!r}")
 
+    def _should_transition(self):
+        # checked in order of cost, but always check for rapid navigations to track them
+        rapid = _is_rapid()
+        if not (self.enabled and _can_transition and _use_transition):
+            return False
+        if _transition is not None or rapid:
+            return False
+        if getattr(document, "visibilityState", "visible") != "visible":
+            return False
+        return not _prefers_reduced_motion()
+
     def __enter__(self):
         global _transition
-        # Only attempt a view transition when supported, enabled, and visible
-        visible = getattr(document, "visibilityState", "visible") == "visible"
         try:
-            if _transition is None and _can_transition and _use_transition and visible:
-                self.transition = document.startViewTransition(self.promise_callback)
-                _transition = self.transition
-                setTimeout(self._observe_ready, 0)
-                sleep(0)
-                setTimeout(self.resolve, 100)
+            if not self._should_transition():
+                return self
+            self.span = span("transition")
+            self.transition = document.startViewTransition(self.promise_callback)
+            _transition = self.transition
+            setTimeout(self._observe_ready, 0)
+            # don't change the DOM until the old view has been captured
+            captured = Promise.race(
+                [self.captured.promise, timeout(MAX_TRANSITION_WAIT)]
+            )
+            if await_promise(captured) is TIMEOUT:
+                logger.debug("View transition did not start in time")
+            # if the new form is slow, stop freezing the old view
+            setTimeout(self.resolve, MAX_TRANSITION_WAIT * 1000)
 
         except Exception as e:
             # startViewTransition can throw InvalidStateError if the document becomes hidden
@@ -60,4 +118,5 @@ class ViewTransition:
         return self
 
     def __exit__(self, *exc_args):
+        # the new form is attached, so let the transition run now
         self.resolve()
@@ -7,6 +7,8 @@ import anvil
 import anvil.server
 
 from . import router
+from .router import _sitemap
+from .router._config import get_routing_config
 from .router._import_utils import import_routes
 
 __version__ = "0.6.1"
@@ -18,26 +20,25 @@ def create_text_file(lines, name: str):
     return anvil.BlobMedia(content_type="text/plain", content=content, name=name)
 
 
-def site_map_iter():
-    origin = anvil.server.get_app_origin()
-    # I don't really know if this bare url is necessary, but what's the harm?
-    yield origin
-
-    yield from (
-        f"{origin}{route.path}"
-        for route in router.sorted_routes
-        if not route.sitemap and route.path
-    )
-
-
 def get_sitemap():
-    """Create and serve a simple sitemap.txt file base on the routes defined in client/routes.py
+    """Serve the first sitemap.txt shard, which is the whole sitemap for most apps
     More info on sitemaps:
     https://developers.google.com/search/docs/crawling-indexing/sitemaps/build-sitemap
     """
-    # serve our up-to-date sitemap
-    file = create_text_file(site_map_iter(), "sitemap.txt")
-    return anvil.server.HttpResponse(200, file)
+    return _sitemap.serve_shard(anvil.server.request, 0, sitemap_cache_time)
+
+
+def get_sitemap_shard(shard):
+    """Serve one of the sitemap files listed in the sitemap index"""
+    return _sitemap.serve_shard(anvil.server.request, shard, sitemap_cache_time)
+
+
+def get_sitemap_index():
+    """Serve a sitemap index for apps with more urls than fit in a single sitemap
+    More info:
+    https://developers.google.com/search/docs/crawling-indexing/sitemaps/large-sitemaps
+    """
+    return _sitemap.serve_index(anvil.server.request, sitemap_cache_time)
 
 
 def get_robots():
@@ -46,20 +47,25 @@ def get_robots():
     https://developers.google.com/search/docs/crawling-indexing/robots/intro
     """
     origin = anvil.server.get_app_origin()
-    lines = [
-        "# robots.txt",  # Just a dumb header for us dumb humans to read.
-        f"Sitemap: {origin}/sitemap.txt",  # Provide the path to the sitemap for crawling
-    ]
+    lines = ["# robots.txt"]  # Just a dumb header for us dumb humans to read.
+    # Provide the path to the sitemap for crawling
+    if routing_config.get("sitemap") and _sitemap.is_sharded(sitemap_cache_time):
+        lines.append(f"Sitemap: {origin}/sitemap-index.xml")
+    else:
+        lines.append(f"Sitemap: {origin}/sitemap.txt")
 
     # Create our txt file and return it in a http response
     file = create_text_file(lines, "robots.txt")
     return anvil.server.HttpResponse(200, file)
 
 
-try:
-    routing_config = anvil.app.get_client_config("routing")
-except AttributeError:
-    routing_config = {}
+def get_metrics():
+    """Serve latency metrics for routes served from this server process"""
+    return router.get_server_metrics()
+
+
+routing_config = get_routing_config()
+sitemap_cache_time = routing_config.get("sitemap_cache_time")
 
 router.debug_logging(bool(routing_config.get("debug_logging")))
 
@@ -68,6 +74,11 @@ import_routes()
 if routing_config.get("sitemap"):
     router.logger.debug("Sitemap enabled")
     anvil.server.route("/sitemap.txt")(get_sitemap)
+    anvil.server.route("/sitemap-index.xml")(get_sitemap_index)
+    anvil.server.route("/sitemap/:shard")(get_sitemap_shard)
 if routing_config.get("robots"):
     router.logger.debug("Robots enabled")
     anvil.server.route("/robots.txt")(get_robots)
+if routing_config.get("metrics_endpoint"):
+    router.logger.debug("Metrics endpoint enabled")
+    anvil.server.http_endpoint("/routing/metrics")(get_metrics)
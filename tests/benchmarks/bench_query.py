@@ -0,0 +1,70 @@
+"""Encoding and decoding a large filter state in the query
+
+Compares stringify_value and decode_query with the JSON round trip they replaced,
+and checks that both produce the same query.
+
+    python -m tests.benchmarks.bench_query
+"""
+
+from timeit import timeit
+
+from client_code.router import _matcher
+from client_code.router._matcher import decode_query
+from client_code.router._navigate import clean_query_params, stringify_value
+from client_code.router._utils import dumps, loads
+
+N = 2000
+
+QUERY = {
+    **{f"filter_{i}": f"value {i}" for i in range(40)},
+    **{f"page_{i}": i for i in range(10)},
+    "search": "anvil routing",
+    "tags": ["a", "b", "c"],
+    "sort": "-created",
+}
+
+
+def json_round_trip(val):
+    if not isinstance(val, str):
+        return dumps(val)
+    try:
+        return dumps(loads(val))
+    except Exception:
+        return val
+
+
+def old_decode_query(query):
+    decoded = dict(query)
+    for key, value in query.items():
+        try:
+            decoded[key] = loads(value)
+        except Exception:
+            pass
+    return decoded
+
+
+def main():
+    values = list(QUERY.values())
+    assert [stringify_value(v) for v in values] == [json_round_trip(v) for v in values]
+    old = timeit(lambda: [json_round_trip(v) for v in values], number=N)
+    new = timeit(lambda: [stringify_value(v) for v in values], number=N)
+    print(f"encode: {old / N * 1e6:.1f}us -> {new / N * 1e6:.1f}us")
+
+    search_params = clean_query_params(QUERY)
+    assert decode_query(search_params) == old_decode_query(search_params)
+    old = timeit(lambda: old_decode_query(search_params), number=N)
+
+    def decode_without_memo():
+        _matcher._decoded_queries.clear()
+        decode_query(search_params)
+
+    new = timeit(decode_without_memo, number=N)
+    print(f"decode: {old / N * 1e6:.1f}us -> {new / N * 1e6:.1f}us")
+
+    search_params.pop("tags")
+    memo = timeit(lambda: decode_query(search_params), number=N)
+    print(f"decode (memoised): {memo / N * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Server rendering latency for a route that loads data with server_fn
+
+Compares calling the server function in-process with calling it through
+anvil.server.call. The anvil.server.call numbers need a real connection, so set
+ANVIL_UPLINK_KEY to an uplink key for an app that uses this dependency.
+
+    ANVIL_UPLINK_KEY=... python -m tests.benchmarks.bench_server_fn
+"""
+
+import os
+from statistics import median
+from time import perf_counter
+
+import anvil.server
+from client_code.router import _route
+from client_code.router._route import Route, sorted_routes
+from client_code.router._server_route import serve_route
+
+N = 50
+
+
+class Request:
+    def __init__(self, path):
+        self.path = path
+        self.query_params = {"page": "1"}
+        self.headers = {}
+
+
+@anvil.server.callable("routing_bench_get_articles")
+def get_articles(**loader_args):
+    page = int(loader_args["query"].get("page", 1))
+    return [
+        {"id": i, "title": f"Article {i}"} for i in range(page * 20, page * 20 + 20)
+    ]
+
+
+class ArticlesRoute(Route):
+    path = "/bench/articles"
+    server_fn = "routing_bench_get_articles"
+
+
+def time_requests(n=N):
+    route = sorted_routes[-1]
+    times = []
+    for _ in range(n):
+        start = perf_counter()
+        serve_route(route, Request("/bench/articles"))
+        times.append(perf_counter() - start)
+    return median(times) * 1000
+
+
+def main():
+    in_process = time_requests()
+    print(f"in-process:        {in_process:.2f}ms (median of {N})")
+
+    key = os.environ.get("ANVIL_UPLINK_KEY")
+    if key is None:
+        print("anvil.server.call: skipped, set ANVIL_UPLINK_KEY to compare")
+        return
+
+    anvil.server.connect(key)
+    get_server_callable = _route.get_server_callable
+    _route.get_server_callable = lambda name: None
+    try:
+        via_call = time_requests()
+    finally:
+        _route.get_server_callable = get_server_callable
+        anvil.server.disconnect()
+    print(f"anvil.server.call: {via_call:.2f}ms (median of {N})")
+
+
+if __name__ == "__main__":
+    main()
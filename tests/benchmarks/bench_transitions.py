@@ -0,0 +1,63 @@
+"""Navigation to paint latency, with and without view transitions
+
+This needs a browser, so it can't run with pytest. Copy it into a client module
+of an app that uses the router, and call it from the browser console or a button:
+
+    from .bench_transitions import main
+    main("/", "/about")
+
+Both paths should use cache_data (or cache_form) so that only rendering is measured.
+For each navigation it measures the time from calling navigate to the first
+animation frame after the new form is attached, and the time spent in
+transition spans.
+"""
+
+from anvil.js.window import Promise, requestAnimationFrame
+from routing import router
+from routing.router import _view_transition
+from routing.router._utils import await_promise, now, timeout
+
+N = 20
+
+
+def next_frame():
+    return await_promise(
+        Promise(lambda resolve, reject: requestAnimationFrame(resolve))
+    )
+
+
+def measure(paths, transitions, pause):
+    router.use_transitions(transitions)
+    sink = router.add_instrumentation_sink(router.MemorySink())
+    durations = []
+    try:
+        for i in range(N):
+            if pause:
+                # longer than RAPID_NAVIGATION, so every navigation can transition
+                await_promise(timeout(_view_transition.RAPID_NAVIGATION + 0.05))
+            start = now()
+            router.navigate(path=paths[i % 2])
+            next_frame()
+            durations.append(now() - start)
+    finally:
+        router.remove_instrumentation_sink(sink)
+        router.use_transitions(True)
+
+    transition = sum(s.duration for s in sink.get_spans("transition"))
+    return sorted(durations), transition / N
+
+
+def report(name, durations, transition):
+    p50 = durations[len(durations) // 2]
+    p95 = durations[int(len(durations) * 0.95) - 1]
+    print(f"{name}: p50 {p50:.1f}ms, p95 {p95:.1f}ms, transition {transition:.1f}ms")
+
+
+def main(path_a, path_b):
+    paths = [path_a, path_b]
+    # warm the caches
+    measure(paths, transitions=False, pause=False)
+
+    report("no transitions", *measure(paths, transitions=False, pause=True))
+    report("transitions", *measure(paths, transitions=True, pause=True))
+    report("rapid navigations", *measure(paths, transitions=True, pause=False))
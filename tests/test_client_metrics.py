@@ -0,0 +1,94 @@
+import anvil.server
+import pytest
+from client_code.router._client_metrics import (
+    disable_client_metrics,
+    enable_client_metrics,
+)
+from client_code.router._instrumentation import span
+from client_code.router._server_metrics import (
+    get_client_metrics,
+    record_client_metrics,
+    reset_client_metrics,
+)
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    batches = []
+
+    def call_s(name, batch):
+        assert name == "record_metrics"
+        batches.append(batch)
+
+    monkeypatch.setattr(anvil.server, "call_s", call_s, raising=False)
+    yield batches
+    disable_client_metrics()
+    reset_client_metrics()
+
+
+def navigate(route, cache="hit"):
+    with span("navigation", path="/") as navigation:
+        with span("match"):
+            pass
+        with span("data", cache=cache):
+            pass
+        navigation.set(route=route)
+
+
+def test_samples_are_sent_in_batches(batches):
+    # the server runs timeouts immediately, so each navigation is flushed
+    enable_client_metrics("record_metrics", batch_size=2)
+    navigate("ArticleRoute")
+    navigate("ArticleRoute", cache="miss")
+
+    samples = [sample for batch in batches for sample in batch["samples"]]
+    assert [s["cache"] for s in samples] == ["hit", "miss"]
+    assert set(samples[0]["phases"]) == {"match", "data"}
+
+    for batch in batches:
+        record_client_metrics(batch)
+    metrics = get_client_metrics("ArticleRoute")
+    assert metrics["count"] == 2
+    assert metrics["cache"] == {"hit": 1, "miss": 1}
+    assert metrics["hit_ratio"] == 0.5
+    assert set(metrics["phases"]) == {"match", "data"}
+
+
+def test_samples_are_dropped_when_the_buffer_is_full(batches):
+    sink = enable_client_metrics("record_metrics", max_samples=2)
+    sink._flushing = True  # waiting for the server
+    for _ in range(5):
+        navigate("ArticleRoute")
+    assert len(sink.samples) == 2
+    assert sink.dropped == 3
+    assert batches == []
+
+    sink._flushing = False
+    sink.flush()
+    assert len(batches[0]["samples"]) == 2
+    assert sink.dropped == 0
+
+
+def test_invalid_samples_are_ignored(batches):
+    record_client_metrics(
+        {
+            "samples": [
+                {"route": "ArticleRoute", "total": 12.5, "phases": {"data": "x"}},
+                {"route": 1, "total": 10},
+                "not a sample",
+            ]
+        }
+    )
+    assert get_client_metrics() == {
+        "ArticleRoute": {
+            "count": 1,
+            "p50": 12.5,
+            "p95": 12.5,
+            "p99": 12.5,
+            "cache": {},
+            "hit_ratio": None,
+            "phases": {},
+        }
+    }
+    with pytest.raises(TypeError):
+        record_client_metrics([])
@@ -0,0 +1,40 @@
+import pytest
+from anvil.history import Location
+from client_code.router._cached import clear_cache
+from client_code.router._context import RoutingContext
+from client_code.router._loader import load_data_promise
+from client_code.router._matcher import get_match
+from client_code.router._route import Route, sorted_routes
+from client_code.router._utils import await_promise
+
+
+@pytest.fixture
+def route():
+    class ArticlesRoute(Route):
+        path = "/articles"
+        reuse_form = True
+
+        def before_load(self, **loader_args):
+            return {"user": "user_1"}
+
+        def load_data(self, **loader_args):
+            return [loader_args["nav_context"]["user"], loader_args["query"]]
+
+    yield ArticlesRoute
+
+    sorted_routes.clear()
+    clear_cache()
+
+
+def test_reused_form_keeps_nav_context(route):
+    # what on_navigate does: run before_load, then reuse the context for a query change
+    context = RoutingContext(match=get_match(Location("/articles")))
+    context.nav_context.update(context.route.before_load(**context._loader_args))
+
+    match = get_match(Location("/articles", search="?page=2"))
+    context._reuse(RoutingContext(match=match, nav_context={"tab": "new"}))
+    assert context.nav_context == {"user": "user_1", "tab": "new"}
+
+    data, error = await_promise(load_data_promise(context))
+    assert error is None
+    assert data == ["user_1", {"page": 2}]
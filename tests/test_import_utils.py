@@ -0,0 +1,39 @@
+import sys
+
+import anvil
+import pytest
+from client_code.router import _import_utils
+from client_code.router._import_utils import import_form, preload_module
+
+
+@pytest.fixture
+def app_package(tmp_path, monkeypatch):
+    form_dir = tmp_path / "test_app" / "Pages" / "Article"
+    form_dir.mkdir(parents=True)
+    (tmp_path / "test_app" / "__init__.py").write_text("")
+    (tmp_path / "test_app" / "Pages" / "__init__.py").write_text("")
+    (form_dir / "__init__.py").write_text(
+        "class Article:\n"
+        "    def __init__(self, **properties):\n"
+        "        self.properties = properties\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(_import_utils, "get_package_name", lambda: "test_app")
+    # import_form is only available on the client
+    monkeypatch.setattr(anvil, "is_server_side", lambda: False)
+    yield
+    for name in list(sys.modules):
+        if name.startswith("test_app"):
+            del sys.modules[name]
+
+
+def test_import_form(app_package):
+    form = import_form("Pages.Article", routing_context=1)
+    assert type(form).__name__ == "Article"
+    assert form.properties == {"routing_context": 1}
+
+
+def test_import_form_after_preload(app_package):
+    preload_module("Pages.Article")
+    form = import_form("Pages.Article", routing_context=1)
+    assert type(form).__name__ == "Article"
@@ -0,0 +1,88 @@
+import pytest
+from anvil.history import Location
+from client_code.router._cached import clear_cache
+from client_code.router._constants import CACHE_FIRST
+from client_code.router._context import RoutingContext
+from client_code.router._instrumentation import (
+    InstrumentationSink,
+    MemorySink,
+    add_instrumentation_sink,
+    event,
+    remove_instrumentation_sink,
+    span,
+)
+from client_code.router._loader import load_data_promise
+from client_code.router._matcher import get_match
+from client_code.router._route import Route, sorted_routes
+from client_code.router._utils import await_promise
+
+
+@pytest.fixture
+def sink():
+    sink = add_instrumentation_sink(MemorySink())
+    yield sink
+    remove_instrumentation_sink(sink)
+    sorted_routes.clear()
+    clear_cache()
+
+
+def test_disabled():
+    with span("data") as s:
+        s.set(cache="hit")
+    assert s.attrs == {}
+    assert s.duration is None
+
+
+def test_spans_and_events(sink):
+    with span("match", path="/"):
+        pass
+    with pytest.raises(ValueError):
+        with span("before_load"):
+            raise ValueError
+    event("pending", path="/")
+
+    match, before_load = sink.spans
+    assert match.name == "match" and match.attrs == {"path": "/"}
+    assert match.duration >= 0
+    assert before_load.attrs == {"error": "ValueError"}
+    assert sink.events == [("pending", {"path": "/"})]
+
+    # finishing twice doesn't record the span twice
+    s = span("meta")
+    s.finish()
+    s.finish()
+    assert len(sink.get_spans("meta")) == 1
+
+
+def test_failing_sink(sink):
+    class FailingSink(InstrumentationSink):
+        def on_span(self, span):
+            raise RuntimeError
+
+    failing = add_instrumentation_sink(FailingSink())
+    try:
+        with span("meta"):
+            pass
+    finally:
+        remove_instrumentation_sink(failing)
+    assert len(sink.get_spans("meta")) == 1
+
+    with pytest.raises(TypeError):
+        add_instrumentation_sink(object())
+
+
+def test_cache_status(sink):
+    class ArticlesRoute(Route):
+        path = "/articles"
+        cache_data = CACHE_FIRST
+
+        def load_data(self, **loader_args):
+            return ["article"]
+
+    def load():
+        context = RoutingContext(match=get_match(Location("/articles")))
+        await_promise(load_data_promise(context))
+        return context._cache_status
+
+    assert load() == "miss"
+    assert load() == "hit"
@@ -0,0 +1,84 @@
+import pytest
+from client_code.router import _meta
+
+
+class FakeNode:
+    def __init__(self, name):
+        self.name = name
+        self.textContent = ""
+        self.attributes = {}
+        self.writes = 0
+
+    def getAttribute(self, name):
+        return self.attributes.get(name)
+
+    def setAttribute(self, name, value):
+        self.writes += 1
+        self.attributes[name] = value
+
+
+class FakeHead:
+    def __init__(self):
+        self.children = []
+
+    def appendChild(self, node):
+        self.children.append(node)
+
+
+class FakeDocument:
+    def __init__(self):
+        self.head = FakeHead()
+        self.lookups = 0
+
+    def querySelector(self, selector):
+        self.lookups += 1
+        for node in self.head.children:
+            if node.name == selector:
+                return node
+            if selector == f'meta[name="{node.getAttribute("name")}"]':
+                return node
+        return None
+
+    def createElement(self, name):
+        return FakeNode(name)
+
+
+@pytest.fixture
+def document(monkeypatch):
+    document = FakeDocument()
+    monkeypatch.setattr(_meta, "document", document)
+    monkeypatch.setattr(_meta, "_CACHE", {})
+    monkeypatch.setattr(_meta, "_last_applied", {})
+    return document
+
+
+def get_meta_node(name):
+    return _meta._CACHE[name].nodes[-1].node
+
+
+def test_only_changed_tags_are_written(document):
+    _meta.update_meta_tags({"title": "Home", "description": "Welcome"})
+    assert get_meta_node("og:title").getAttribute("content") == "Home"
+    title, description = get_meta_node("title"), get_meta_node("description")
+    title_writes, description_writes = title.writes, description.writes
+
+    lookups = document.lookups
+    _meta.update_meta_tags({"title": "About", "description": "Welcome"})
+    assert title.writes == title_writes + 1
+    assert title.getAttribute("content") == "About"
+    assert description.writes == description_writes
+    assert document.lookups == lookups
+
+
+def test_removed_tags_are_reset(document):
+    _meta.update_meta_tags({"title": "Home", "keywords": "anvil"})
+    keywords = get_meta_node("keywords")
+    assert keywords.getAttribute("content") == "anvil"
+
+    _meta.update_meta_tags({"title": "Home"})
+    assert keywords.getAttribute("content") == ""
+    writes = keywords.writes
+
+    # it was reset last time, so it isn't reset again
+    _meta.update_meta_tags({"title": "About"})
+    assert keywords.writes == writes
@@ -0,0 +1,100 @@
+import pytest
+from anvil.history import Location
+from client_code.router import _navigate
+from client_code.router._navigate import cancel_pending_navigation, navigate
+
+
+class FakeHistory:
+    def __init__(self):
+        self.location = Location("/search")
+        self.entries = []
+
+    def push(self, location):
+        self.entries.append(("push", location.path, location.search))
+        self.location = location
+
+    def replace(self, location):
+        self.entries.append(("replace", location.path, location.search))
+        self.location = location
+
+
+class FakeTimers:
+    def __init__(self):
+        self.callbacks = {}
+        self.next_handle = 0
+
+    def set_timeout(self, fn, ms=0):
+        self.next_handle += 1
+        self.callbacks[self.next_handle] = fn
+        return self.next_handle
+
+    def clear_timeout(self, handle):
+        self.callbacks.pop(handle, None)
+
+    def run(self):
+        callbacks = list(self.callbacks.values())
+        self.callbacks.clear()
+        for fn in callbacks:
+            fn()
+
+
+@pytest.fixture
+def history(monkeypatch):
+    history = FakeHistory()
+    monkeypatch.setattr(_navigate, "history", history)
+    yield history
+    cancel_pending_navigation()
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    # on the server setTimeout calls the function immediately
+    timers = FakeTimers()
+    monkeypatch.setattr(_navigate, "setTimeout", timers.set_timeout)
+    monkeypatch.setattr(_navigate, "clearTimeout", timers.clear_timeout)
+    return timers
+
+
+def test_debounced_navigations_are_merged(history, timers):
+    navigate(query={"q": "a"}, debounce=0.3)
+    navigate(query={"q": "ab"}, debounce=0.3)
+    navigate(query={"q": "abc"}, debounce=0.3)
+    assert history.entries == []
+    assert len(timers.callbacks) == 1
+
+    timers.run()
+    assert history.entries == [("push", "/search", "?q=abc")]
+
+
+def test_debounced_query_function_gets_the_waiting_query(history, timers):
+    navigate(query=lambda prev: {**prev, "q": "a"}, debounce=0.3)
+    navigate(query=lambda prev: {**prev, "page": 2}, debounce=0.3)
+    timers.run()
+    assert history.entries == [("push", "/search", "?page=2&q=a")]
+
+
+def test_debounced_navigation_only_replaces_if_every_call_did(history, timers):
+    navigate(query={"q": "a"}, replace=True, debounce=0.3)
+    navigate(query={"q": "ab"}, debounce=0.3)
+    timers.run()
+    assert history.entries == [("push", "/search", "?q=ab")]
+
+    navigate(query={"q": "abc"}, replace=True, debounce=0.3)
+    navigate(query={"q": "abcd"}, replace=True, debounce=0.3)
+    timers.run()
+    assert history.entries[-1] == ("replace", "/search", "?q=abcd")
+
+
+def test_cancel_pending_navigation(history, timers):
+    navigate(query={"q": "a"}, debounce=0.3)
+    # what the history listener does on back/forward
+    cancel_pending_navigation()
+    timers.run()
+    assert history.entries == []
+
+
+def test_navigate_cancels_pending_navigation(history, timers):
+    navigate(query={"q": "a"}, debounce=0.3)
+    navigate(path="/about")
+    timers.run()
+    assert history.entries == [("push", "/about", "")]
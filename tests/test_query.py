@@ -0,0 +1,77 @@
+import json
+
+from client_code.router._matcher import decode_query
+from client_code.router._navigate import clean_query_params, stringify_value
+from client_code.router._utils import dumps, loads
+
+VALUES = [
+    "",
+    " ",
+    "income",
+    "foo bar",
+    "true",
+    "True",
+    "trueish",
+    "null",
+    "none",
+    "NaN",
+    "Infinity",
+    "-Infinity",
+    "-",
+    "0",
+    "01",
+    "-1",
+    "1.5",
+    "1.",
+    ".5",
+    "1e5",
+    "1E-5",
+    "1_000",
+    "2024-01-01",
+    " 42 ",
+    "\t7\n",
+    "[1, 2]",
+    "[1, 2",
+    '{"b": 1, "a": 2}',
+    '"quoted"',
+    '"unterminated',
+    "{not json}",
+    "١٢",
+    "﻿1",
+]
+
+
+def json_round_trip(val):
+    # the implementation before maybe_json was added
+    if not isinstance(val, str):
+        return dumps(val)
+    try:
+        return dumps(loads(val))
+    except Exception:
+        return val
+
+
+def test_stringify_value_matches_json_round_trip():
+    for val in VALUES:
+        assert stringify_value(val) == json_round_trip(val), val
+
+
+def test_clean_query_params():
+    query = {"tab": "income", "page": 2, "tags": ["a", "b"], "q": "1"}
+    assert clean_query_params(query) == {
+        "page": "2",
+        "q": "1",
+        "tab": "income",
+        "tags": json.dumps(["a", "b"]),
+    }
+
+
+def test_decode_query():
+    query = {"tab": "income", "page": "2", "tags": '["a", "b"]', "q": "01"}
+    decoded = decode_query(query)
+    assert decoded == {"tab": "income", "page": 2, "tags": ["a", "b"], "q": "01"}
+    # lists could be mutated by parse_query, so they're decoded every time
+    assert decode_query(query)["tags"] is not decoded["tags"]
+
+    query = {"tab": "income", "page": "2"}
+    assert decode_query(query) is decode_query(dict(query))
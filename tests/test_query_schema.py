@@ -0,0 +1,150 @@
+import pytest
+from anvil.history import Location
+from client_code.router import _matcher, _route
+from client_code.router._cached import clear_cache
+from client_code.router._exceptions import InvalidQuery
+from client_code.router._matcher import get_match
+from client_code.router._navigate import get_query_schema, nav_args_to_location
+from client_code.router._query_schema import COMPRESSED_PREFIX, QueryField
+from client_code.router._route import Route, sorted_routes
+from client_code.router._utils import dumps
+
+
+@pytest.fixture
+def route():
+    class ArticlesRoute(Route):
+        path = "/articles"
+        query_schema = {
+            "page": QueryField(int, default=1),
+            "sort": QueryField(default="new", choices=["new", "top"]),
+            "draft": QueryField(bool, default=False),
+            "tags": QueryField(list, default=[]),
+            "search": QueryField(),
+        }
+
+    yield ArticlesRoute
+
+    sorted_routes.clear()
+    clear_cache()
+
+
+def test_decode(route):
+    match = get_match(Location("/articles", search="?page=2&tags=%5B%22a%22%5D&x=1"))
+    assert match.error is None
+    assert match.query == {
+        "page": 2,
+        "sort": "new",
+        "draft": False,
+        "tags": ["a"],
+        "search": None,
+    }
+
+    # search is a string, so it isn't decoded as a number
+    match = get_match(Location("/articles", search="?search=1&draft=true"))
+    assert match.query["search"] == "1"
+    assert match.query["draft"] is True
+
+
+def test_invalid_query(route):
+    for search in ["?page=two", "?sort=old", "?draft=yes", "?tags=a"]:
+        match = get_match(Location("/articles", search=search))
+        assert isinstance(match.error, InvalidQuery), search
+        assert match.route is not None
+
+
+def test_defaults_are_left_out_of_urls_and_keys(route):
+    location = nav_args_to_location(
+        path="/articles",
+        query={"page": 1, "sort": "top", "draft": False, "tags": [], "other": 1},
+        params=None,
+        hash=None,
+    )
+    assert location.search == "?sort=top"
+
+    default = get_match(Location("/articles"))
+    explicit = get_match(Location("/articles", search="?page=1&sort=new"))
+    assert default.key == explicit.key == "/articles:{}"
+
+
+def test_invalid_schema():
+    with pytest.raises(TypeError):
+
+        class InvalidRoute(Route):
+            query_schema = {"page": int}
+
+    with pytest.raises(TypeError):
+        QueryField(set)
+
+
+def test_compressed(route):
+    class ReportRoute(Route):
+        path = "/report"
+        query_schema = {"filters": QueryField(dict, default={}, compress=True)}
+
+    filters = {f"column_{i}": {"op": "eq", "value": i} for i in range(20)}
+    location = nav_args_to_location(
+        path="/report", query={"filters": filters}, params=None, hash=None
+    )
+    assert location.search.startswith("?filters=" + COMPRESSED_PREFIX)
+    assert len(location.search) < len(dumps(filters))
+
+    match = get_match(location)
+    assert match.error is None
+    assert match.query == {"filters": filters}
+
+    # small values aren't compressed, and plain json still decodes
+    location = nav_args_to_location(
+        path="/report", query={"filters": {"a": 1}}, params=None, hash=None
+    )
+    assert not location.search.startswith("?filters=" + COMPRESSED_PREFIX)
+    assert get_match(location).query == {"filters": {"a": 1}}
+
+    match = get_match(Location("/report", search="?filters=~zbm90LWRlZmxhdGU"))
+    assert isinstance(match.error, InvalidQuery)
+
+
+def test_compressed_prefix_in_plain_values(route):
+    class SearchRoute(Route):
+        path = "/search"
+        query_schema = {"q": QueryField(default="", compress=True)}
+
+    for q in ["~zebra", "~~", "~", "zebra~z"]:
+        location = nav_args_to_location(
+            path="/search", query={"q": q}, params=None, hash=None
+        )
+        match = get_match(location)
+        assert match.error is None, q
+        assert match.query == {"q": q}
+
+
+def test_query_schema_lookup_is_skipped_without_schemas(monkeypatch):
+    class AboutRoute(Route):
+        path = "/about"
+
+    def match_route(path):
+        raise AssertionError("match_route should not be called")
+
+    monkeypatch.setattr(_route, "has_query_schemas", False)
+    monkeypatch.setattr(_matcher, "match_route", match_route)
+    try:
+        assert get_query_schema("/about") is None
+        location = nav_args_to_location(
+            path="/about", query={"page": 2}, params=None, hash=""
+        )
+        assert location.search == "?page=2"
+    finally:
+        sorted_routes.clear()
+
+
+def test_query_schema_lookup(route):
+    assert _route.has_query_schemas
+    assert get_query_schema("/articles") is route._query_schema
+    assert get_query_schema("/about") is None
+
+
+def test_mutable_defaults_are_copied(route):
+    schema = route._query_schema
+    query = schema.decode({})
+    query["tags"].append("x")
+    assert schema.decode({})["tags"] == []
+    assert schema.encode({"tags": ["x"]}) == {"tags": '["x"]'}
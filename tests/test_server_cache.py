@@ -0,0 +1,193 @@
+import threading
+from time import sleep
+
+import pytest
+from client_code.router._cached import clear_cache
+from client_code.router._loader import ensure_data
+from client_code.router._route import Route, sorted_routes
+from client_code.router._server_cache import (
+    MemoryCacheBackend,
+    ServerCache,
+    SQLiteCacheBackend,
+    get_server_cache,
+)
+from client_code.router._server_route import serve_route
+
+
+def get_route(route_cls):
+    return next(route for route in sorted_routes if type(route) is route_cls)
+
+
+class Request:
+    def __init__(self, path, query_params=None):
+        self.path = path
+        self.query_params = query_params or {}
+
+
+@pytest.fixture
+def server_cache():
+    cache = get_server_cache()
+    cache.invalidate()
+    yield cache
+    cache.invalidate()
+    sorted_routes.clear()
+    clear_cache()
+
+
+def test_ttl_and_lru():
+    cache = ServerCache(MemoryCacheBackend(max_size=2))
+    calls = []
+
+    def loader(value):
+        def load():
+            calls.append(value)
+            return value
+
+        return load
+
+    assert cache.get_or_load("a", loader(1), ttl=0.05) == 1
+    assert cache.get_or_load("a", loader(2), ttl=0.05) == 1
+    sleep(0.06)
+    assert cache.get_or_load("a", loader(3), ttl=10) == 3
+
+    cache.get_or_load("b", loader(4), ttl=10)
+    cache.get_or_load("a", loader(5), ttl=10)  # a is now most recently used
+    cache.get_or_load("c", loader(6), ttl=10)  # evicts b
+    assert cache.get_or_load("b", loader(7), ttl=10) == 7
+    assert calls == [1, 3, 4, 6, 7]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 5
+
+
+def test_concurrent_loads_are_coalesced():
+    cache = ServerCache()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        sleep(0.05)
+        return "data"
+
+    def worker():
+        results.append(cache.get_or_load("/articles:{}", load, ttl=10))
+
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["data"] * 20
+    assert cache.stats()["coalesced"] + cache.stats()["hits"] == 19
+
+
+def test_errors_are_not_cached():
+    cache = ServerCache()
+
+    def fail():
+        raise ValueError("nope")
+
+    with pytest.raises(ValueError):
+        cache.get_or_load("a", fail, ttl=10)
+    assert cache.get_or_load("a", lambda: 1, ttl=10) == 1
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_backend_invalidation(backend, tmp_path):
+    if backend == "memory":
+        backend = MemoryCacheBackend()
+    else:
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+
+    backend.set("/articles:{}", [1, 2], ttl=10, tags=["ArticlesRoute"])
+    backend.set("/articles/1:{}", {"id": 1}, ttl=10, tags=["ArticleRoute"])
+    backend.set("/articles/2:{}", {"id": 2}, ttl=10, tags=["ArticleRoute"])
+    backend.set("/about:{}", "about", ttl=-1)
+
+    assert backend.get("/articles:{}") == [1, 2]
+    with pytest.raises(KeyError):
+        backend.get("/about:{}")
+    assert backend.size() == 3
+
+    backend.delete_tag("ArticleRoute")
+    with pytest.raises(KeyError):
+        backend.get("/articles/1:{}")
+    assert backend.size() == 1
+
+    backend.set("/articles/1:{}", {"id": 1}, ttl=10)
+    backend.delete_prefix("/articles")
+    assert backend.size() == 0
+
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / "cache.db")
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {"id": 1}
+
+    # two caches with their own backends, as if in separate server processes
+    first = ServerCache(SQLiteCacheBackend(path))
+    second = ServerCache(SQLiteCacheBackend(path))
+    assert first.get_or_load("/articles/1:{}", load, ttl=10) == {"id": 1}
+    assert second.get_or_load("/articles/1:{}", load, ttl=10) == {"id": 1}
+    assert calls == [1]
+
+    second.invalidate_path("/articles")
+    first.get_or_load("/articles/1:{}", load, ttl=10)
+    assert calls == [1, 1]
+
+
+def test_public_routes_share_loaded_data(server_cache):
+    calls = []
+
+    class PublicRoute(Route):
+        path = "/public"
+        public = True
+        cache_data = True
+
+        def load_data(self, **loader_args):
+            calls.append(1)
+            return "public"
+
+    class NoCacheRoute(Route):
+        path = "/no-cache"
+        public = True
+
+        def load_data(self, **loader_args):
+            calls.append(2)
+            return "private"
+
+    for _ in range(3):
+        serve_route(get_route(PublicRoute), Request("/public"))
+        serve_route(get_route(NoCacheRoute), Request("/no-cache"))
+
+    assert calls == [1, 2, 2, 2]
+    assert server_cache.stats()["hits"] == 2
+
+
+def test_hits_send_the_same_as_misses(server_cache):
+    class PublicRoute(Route):
+        path = "/public"
+        public = True
+        cache_data = True
+
+        def load_data(self, **loader_args):
+            ensure_data(path="/public", query={"page": 2}, data="page 2")
+            return "page 1"
+
+    route = get_route(PublicRoute)
+    hits = server_cache.stats()["hits"]
+    first = serve_route(route, Request("/public")).body.data["cache"]["entries"]
+    sleep(0.05)
+    second = serve_route(route, Request("/public")).body.data["cache"]["entries"]
+    assert server_cache.stats()["hits"] == hits + 1
+
+    assert list(second) == list(first)
+    # [url, data, age, stale], and the age counts from when the data was loaded
+    for key, [url, data, age, stale] in second.items():
+        assert [url, data] == first[key][:2]
+        assert age >= 0.05
@@ -0,0 +1,711 @@
+import json
+from datetime import datetime, timedelta
+from threading import BoundedSemaphore, Event, current_thread
+from time import sleep
+
+import anvil.server
+import pytest
+from anvil import _threaded_server
+from anvil.history import Location
+from client_code.router import _loader, _server_route
+from client_code.router._cached import (
+    CACHED_DATA,
+    DataCache,
+    _StartupEntry,
+    clear_cache,
+    get_request_cache,
+)
+from client_code.router._constants import NO_CACHE, STALE_WHILE_REVALIDATE
+from client_code.router._context import RoutingContext
+from client_code.router._exceptions import Redirect
+from client_code.router._loader import CachedData, ensure_data, load_data_promise
+from client_code.router._matcher import get_match
+from client_code.router._route import Route, sorted_routes
+from client_code.router._server_metrics import (
+    ServerTiming,
+    get_server_metrics,
+    reset_server_metrics,
+)
+from client_code.router._server_profiling import (
+    disable_profiling,
+    enable_profiling,
+    summarize_profiles,
+)
+from client_code.router._server_route import serve_route
+from client_code.router._utils import await_promise
+
+
+def get_route(route_cls):
+    return next(route for route in sorted_routes if type(route) is route_cls)
+
+
+class Request:
+    def __init__(self, path, query_params=None, headers=None):
+        self.path = path
+        self.query_params = query_params or {}
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def routes():
+    class ArticlesRoute(Route):
+        path = "/articles"
+
+        def load_data(self, **loader_args):
+            return {"page": loader_args["query"].get("page", 1)}
+
+    class ArticleRoute(Route):
+        path = "/articles/:id"
+
+        def load_data(self, **loader_args):
+            return {"id": loader_args["params"]["id"], "body": "Lorem ipsum"}
+
+    yield [ArticlesRoute, ArticleRoute]
+
+    sorted_routes.clear()
+    clear_cache()
+    _server_route.clear_permanent_redirects()
+
+
+def get_headers(response):
+    # uplink wraps headers in an HttpHeaders object with lower case names
+    headers = response.headers
+    return {
+        k.lower(): v for k, v in dict(getattr(headers, "_headers", headers)).items()
+    }
+
+
+def get_cache(response):
+    # the startup cache is sent as {key: [url, data, age, stale]}
+    cache = response.body.data["cache"]
+    assert cache["v"] == 1
+    return {key: entry[1] for key, entry in cache["entries"].items()}
+
+
+def payload_size(response):
+    return len(json.dumps(get_cache(response)))
+
+
+def test_request_cache_only_contains_matched_key(routes):
+    [ArticlesRoute, ArticleRoute] = routes
+
+    response = serve_route(get_route(ArticleRoute), Request("/articles/100"), id="100")
+    first_size = payload_size(response)
+
+    for id in range(101, 300):
+        response = serve_route(
+            get_route(ArticleRoute), Request(f"/articles/{id}"), id=str(id)
+        )
+        assert len(get_cache(response)) == 1
+        assert payload_size(response) == first_size
+
+    assert CACHED_DATA == {}
+    assert get_request_cache() is None
+
+
+def test_startup_cache_is_hydrated_lazily(routes, monkeypatch):
+    monkeypatch.setattr(anvil.server, "get_app_origin", lambda: "https://app.anvil.app")
+    [ArticlesRoute, ArticleRoute] = routes
+    ArticleRoute.cache_data = STALE_WHILE_REVALIDATE
+    ArticleRoute.gc_time = 60
+
+    response = serve_route(get_route(ArticleRoute), Request("/articles/1"))
+    startup_cache = response.body.data["cache"]
+    [entry] = startup_cache["entries"].values()
+    assert entry[0] == "/articles/1"
+
+    cache = DataCache()
+    cache.load_startup(startup_cache)
+    assert "/articles/1:{}" in cache
+    assert isinstance(dict.get(cache, "/articles/1:{}"), _StartupEntry)
+
+    cached = cache["/articles/1:{}"]
+    assert isinstance(cached, CachedData)
+    assert cached.data == {"id": "1", "body": "Lorem ipsum"}
+    assert cached.mode == STALE_WHILE_REVALIDATE
+    assert cached.gc_time == 60
+    assert cached.location.path == "/articles/1"
+    assert dict.get(cache, "/articles/1:{}") is cached
+
+
+def test_gc_does_not_hydrate_fresh_startup_entries(routes, monkeypatch):
+    def hydrate(self):
+        raise AssertionError("hydrated during gc")
+
+    monkeypatch.setattr(_StartupEntry, "hydrate", hydrate)
+    cache = DataCache()
+    cache.load_startup(
+        {"v": 1, "entries": {"/articles/1:{}": ["/articles/1", {"id": "1"}, 5, False]}}
+    )
+    assert cache.get_gc_keys(min_gc_time=60) == []
+    assert isinstance(dict.get(cache, "/articles/1:{}"), _StartupEntry)
+
+
+def test_gc_collects_expired_startup_entries(routes, monkeypatch):
+    monkeypatch.setattr(anvil.server, "get_app_origin", lambda: "https://app.anvil.app")
+    [ArticlesRoute, ArticleRoute] = routes
+    ArticleRoute.cache_data = STALE_WHILE_REVALIDATE
+    ArticleRoute.gc_time = 60
+
+    cache = DataCache()
+    cache.load_startup(
+        {
+            "v": 1,
+            "entries": {
+                "/articles/1:{}": ["/articles/1", {"id": "1"}, 90, False],
+                "/articles/2:{}": ["/articles/2", {"id": "2"}, 5, False],
+            },
+        }
+    )
+    assert cache.get_gc_keys(min_gc_time=60) == ["/articles/1:{}"]
+
+
+def test_request_cache_includes_ensured_data(routes):
+    [ArticlesRoute, ArticleRoute] = routes
+
+    class PreloadingRoute(ArticlesRoute):
+        path = "/latest"
+        cache_data = True
+
+        def load_data(self, **loader_args):
+            ensure_data(path="/latest", query={"page": 2}, data={"page": 2})
+            return {"page": 1}
+
+    response = serve_route(get_route(PreloadingRoute), Request("/latest"))
+    assert len(get_cache(response)) == 2
+
+    response = serve_route(get_route(ArticlesRoute), Request("/articles"))
+    assert len(get_cache(response)) == 1
+    assert CACHED_DATA == {}
+
+
+def test_server_uses_the_matched_route(routes, monkeypatch):
+    [ArticlesRoute, ArticleRoute] = routes
+
+    def get_match(location):
+        raise AssertionError("should not match every route")
+
+    monkeypatch.setattr(_server_route, "get_match", get_match)
+    response = serve_route(
+        get_route(ArticleRoute), Request("/articles/a%20b"), id="a%20b"
+    )
+    [data] = get_cache(response).values()
+    assert data["id"] == "a b"
+
+
+def test_server_falls_back_to_matching_every_route(routes):
+    [ArticlesRoute, ArticleRoute] = routes
+
+    # the http router matches /articles as a prefix of /articles/123
+    response = serve_route(get_route(ArticlesRoute), Request("/articles/123"))
+    [data] = get_cache(response).values()
+    assert data == {"id": "123", "body": "Lorem ipsum"}
+
+
+def test_parallel_meta_and_data(routes):
+    # each waits for the other to start, which only works if they run at the same time
+    meta_started = Event()
+    data_started = Event()
+    overlapped = []
+    data_threads = []
+
+    class SlowRoute(Route):
+        path = "/slow"
+        server_parallel_meta = True
+
+        def meta(self, **loader_args):
+            meta_started.set()
+            overlapped.append(data_started.wait(timeout=1))
+            return {"title": "Slow"}
+
+        def load_data(self, **loader_args):
+            data_threads.append(current_thread())
+            data_started.set()
+            overlapped.append(meta_started.wait(timeout=1))
+            ensure_data(path="/slow", query={"page": 2}, data="page 2")
+            return "page 1"
+
+    SlowRoute.cache_data = True
+    response = serve_route(get_route(SlowRoute), Request("/slow"))
+    assert overlapped == [True, True]
+    # only meta goes to the pool
+    assert data_threads == [current_thread()]
+    assert response.body.meta == {"title": "Slow"}
+    assert len(get_cache(response)) == 2
+
+
+def test_parallel_timeout(routes):
+    class SlowRoute(Route):
+        path = "/slow"
+        server_parallel_meta = True
+        server_timeout = 0.05
+
+        def meta(self, **loader_args):
+            return {"title": "Slow"}
+
+        def load_data(self, **loader_args):
+            sleep(0.2)
+            return "data"
+
+    response = serve_route(get_route(SlowRoute), Request("/slow"))
+    assert response.body.meta == {"title": "Slow"}
+    assert get_cache(response) == {}
+
+
+def test_parallel_redirect(routes, monkeypatch):
+    monkeypatch.setattr(anvil.server, "get_app_origin", lambda: "https://app.anvil.app")
+
+    class RedirectRoute(Route):
+        path = "/old"
+        server_parallel_meta = True
+
+        def before_load(self, **loader_args):
+            raise Redirect(path="/articles")
+
+    response = serve_route(get_route(RedirectRoute), Request("/old"))
+    assert response.status == 302
+
+
+def test_redirect_chains_are_followed_on_the_server(routes, monkeypatch):
+    monkeypatch.setattr(anvil.server, "get_app_origin", lambda: "https://app.anvil.app")
+    calls = []
+
+    class FirstRoute(Route):
+        path = "/first"
+
+        def before_load(self, **loader_args):
+            calls.append("first")
+            raise Redirect(path="/second", permanent=True)
+
+    class SecondRoute(Route):
+        path = "/second"
+
+        def before_load(self, **loader_args):
+            calls.append("second")
+            raise Redirect(path="/articles", query={"page": 2}, permanent=True)
+
+    class LoginRoute(Route):
+        path = "/account"
+
+        def before_load(self, **loader_args):
+            raise Redirect(path="/second")
+
+    response = serve_route(get_route(FirstRoute), Request("/first"))
+    assert response.status == 301
+    assert get_headers(response)["location"] == "https://app.anvil.app/articles?page=2"
+    assert calls == ["first", "second"]
+
+    # permanent redirects are answered without running any hooks
+    response = serve_route(get_route(FirstRoute), Request("/first"))
+    assert response.status == 301
+    assert calls == ["first", "second"]
+
+    # a chain is only permanent if every redirect in it is permanent
+    response = serve_route(get_route(LoginRoute), Request("/account"))
+    assert response.status == 302
+    assert get_headers(response)["location"] == "https://app.anvil.app/articles?page=2"
+    response = serve_route(get_route(LoginRoute), Request("/account"))
+    assert response.status == 302
+
+
+def test_redirect_loops_stop(routes, monkeypatch):
+    monkeypatch.setattr(anvil.server, "get_app_origin", lambda: "https://app.anvil.app")
+
+    class PingRoute(Route):
+        path = "/ping"
+
+        def before_load(self, **loader_args):
+            raise Redirect(path="/pong")
+
+    class PongRoute(Route):
+        path = "/pong"
+
+        def before_load(self, **loader_args):
+            raise Redirect(path="/ping")
+
+    response = serve_route(get_route(PingRoute), Request("/ping"))
+    assert response.status == 302
+
+
+def test_preload(routes):
+    [ArticlesRoute, ArticleRoute] = routes
+
+    class SlowRoute(Route):
+        path = "/slow/:id"
+
+        def load_data(self, **loader_args):
+            sleep(0.2)
+            return "slow"
+
+    class PreloadingRoute(ArticlesRoute):
+        path = "/feed"
+        server_preload_time = 0.1
+
+        def load_data(self, **loader_args):
+            return [{"id": "1"}, {"id": "2"}]
+
+        def preload(self, data, **loader_args):
+            return [
+                {"path": "/articles/:id", "params": data[0]},
+                "/articles/2",
+                "/articles/2",
+                "/slow/1",
+                "/missing",
+            ]
+
+    response = serve_route(get_route(PreloadingRoute), Request("/feed"))
+    cache = get_cache(response)
+    assert list(cache) == ["/feed:{}", "/articles/1:{}", "/articles/2:{}"]
+    assert cache["/articles/2:{}"] == {"id": "2", "body": "Lorem ipsum"}
+
+
+def test_late_preloads_do_not_block_later_requests(routes, monkeypatch):
+    [ArticlesRoute, ArticleRoute] = routes
+    monkeypatch.setattr(_server_route, "_preload_slots", BoundedSemaphore(1))
+    release = Event()
+    calls = []
+
+    class SlowRoute(Route):
+        path = "/slow/:id"
+
+        def load_data(self, **loader_args):
+            calls.append(loader_args["params"]["id"])
+            release.wait(1)
+            return "slow"
+
+    class PreloadingRoute(ArticlesRoute):
+        path = "/feed"
+        server_preload_time = 0.01
+
+        def load_data(self, **loader_args):
+            return []
+
+        def preload(self, data, **loader_args):
+            return ["/slow/1", "/articles/1"]
+
+    route = get_route(PreloadingRoute)
+    response = serve_route(route, Request("/feed"))
+    assert list(get_cache(response)) == ["/feed:{}"]
+    assert calls == ["1"]
+
+    # the late preload still holds the only worker, so nothing else is preloaded
+    response = serve_route(route, Request("/feed"))
+    assert list(get_cache(response)) == ["/feed:{}"]
+    assert calls == ["1"]
+
+    release.set()
+    assert _server_route._preload_slots.acquire(timeout=1)
+    _server_route._preload_slots.release()
+
+
+def test_old_preloaded_data_is_reloaded(routes, monkeypatch):
+    monkeypatch.setattr(_loader, "_initial_request", False)
+    [ArticlesRoute, ArticleRoute] = routes
+    match = get_match(Location("/articles/1"))
+
+    def load():
+        context = RoutingContext(match=match)
+        data, error = await_promise(load_data_promise(context))
+        return data, context._cache_status
+
+    fresh = {"id": "1", "body": "Lorem ipsum"}
+    for age, expected in [(1, ("preloaded", "hit")), (60, (fresh, "miss"))]:
+        cached = CachedData(
+            data="preloaded", location=match.location, mode=NO_CACHE, gc_time=0
+        )
+        cached.fetched_at = datetime.now() - timedelta(seconds=age)
+        CACHED_DATA[match.key] = cached
+        assert load() == expected
+        # preloaded data is only used once
+        assert match.key not in CACHED_DATA
+
+
+def test_timeout_sends_the_page_without_data(routes):
+    class SlowRoute(Route):
+        path = "/slow"
+        cache_data = True
+        server_timeout = 0.05
+
+        def meta(self, **loader_args):
+            return {"title": "Slow"}
+
+        def load_data(self, **loader_args):
+            sleep(0.1)
+            ensure_data(path="/slow", query={"page": 2}, data="page 2")
+            return "page 1"
+
+    route = get_route(SlowRoute)
+    response = serve_route(route, Request("/slow"))
+    assert response.body.meta == {"title": "Slow"}
+    assert get_cache(response) == {}
+    sleep(0.1)
+    # late results are not added to a response that has already been sent
+    assert get_cache(response) == {}
+
+    route.server_timeout = 1
+    response = serve_route(route, Request("/slow"))
+    assert len(get_cache(response)) == 2
+
+
+def test_late_loads_do_not_block_later_requests(routes, monkeypatch):
+    monkeypatch.setattr(_server_route, "_timeout_slots", BoundedSemaphore(1))
+    reset_server_metrics()
+    release = Event()
+    calls = []
+
+    class SlowRoute(Route):
+        path = "/slow"
+        server_timeout = 0.01
+
+        def load_data(self, **loader_args):
+            calls.append(1)
+            release.wait(1)
+            return "data"
+
+    route = get_route(SlowRoute)
+    response = serve_route(route, Request("/slow"))
+    assert get_cache(response) == {}
+    assert len(calls) == 1
+
+    # the late load still holds the only worker, so the page is sent straight away
+    response = serve_route(route, Request("/slow"))
+    assert get_cache(response) == {}
+    assert len(calls) == 1
+    assert get_server_metrics("SlowRoute")["outcomes"] == {"fallback": 2}
+
+    release.set()
+    # wait for the late load to give its worker back
+    assert _server_route._timeout_slots.acquire(timeout=1)
+    _server_route._timeout_slots.release()
+    route.server_timeout = 1
+    response = serve_route(route, Request("/slow"))
+    assert get_cache(response) == {"/slow:{}": "data"}
+
+
+def test_timeout_loads_keep_the_request_state(routes, monkeypatch):
+    # e.g. anvil.server.session and anvil.users.get_user() read this thread local
+    call_info = _threaded_server.call_info
+    monkeypatch.setattr(call_info, "session", {"user": "user_1"}, raising=False)
+
+    class AccountRoute(Route):
+        path = "/account"
+        server_timeout = 1
+
+        def load_data(self, **loader_args):
+            return call_info.session["user"]
+
+    response = serve_route(get_route(AccountRoute), Request("/account"))
+    assert get_cache(response) == {"/account:{}": "user_1"}
+
+
+def test_server_render_modes(routes):
+    calls = []
+
+    class DashboardRoute(Route):
+        path = "/dashboard"
+        server_render = "shell"
+
+        def parse_query(self, query):
+            calls.append("parse_query")
+            return query
+
+        def before_load(self, **loader_args):
+            calls.append("before_load")
+
+        def meta(self, **loader_args):
+            calls.append("meta")
+            return {"title": "Dashboard"}
+
+        def load_data(self, **loader_args):
+            calls.append("load_data")
+
+    route = get_route(DashboardRoute)
+    response = serve_route(route, Request("/dashboard"))
+    assert response.body.meta is None
+    assert get_cache(response) == {}
+    assert calls == []
+
+    route.server_render = "meta"
+    response = serve_route(route, Request("/dashboard"))
+    assert response.body.meta == {"title": "Dashboard"}
+    assert get_cache(response) == {}
+    assert calls == ["parse_query", "meta"]
+
+    with pytest.raises(ValueError):
+
+        class InvalidRoute(Route):
+            path = "/invalid"
+            server_render = "partial"
+
+
+def test_http_cache(routes):
+    calls = []
+
+    class VersionedRoute(Route):
+        path = "/versioned"
+        http_cache = True
+        public = True
+        stale_time = 60
+
+        def cache_version(self, **loader_args):
+            return 3
+
+        def load_data(self, **loader_args):
+            calls.append(1)
+            return "data"
+
+    class FingerprintRoute(Route):
+        path = "/fingerprint"
+        http_cache = True
+
+        def load_data(self, **loader_args):
+            calls.append(2)
+            return {"id": 1}
+
+    route = get_route(VersionedRoute)
+    response = serve_route(route, Request("/versioned"))
+    assert response.status == 200
+    assert get_cache(response) == {"/versioned:{}": "data"}
+    headers = get_headers(response)
+    assert headers["cache-control"] == "public, max-age=60, stale-while-revalidate=1800"
+
+    etag = headers["etag"]
+    response = serve_route(
+        route, Request("/versioned", headers={"if-none-match": etag})
+    )
+    assert response.status == 304
+    assert calls == [1]
+
+    route = get_route(FingerprintRoute)
+    response = serve_route(route, Request("/fingerprint"))
+    etag = get_headers(response)["etag"]
+    response = serve_route(
+        route, Request("/fingerprint", headers={"if-none-match": etag})
+    )
+    assert response.status == 304
+    assert calls == [1, 2, 2]
+
+
+def test_cache_version_errors_use_the_fingerprint(routes):
+    class BrokenVersionRoute(Route):
+        path = "/broken-version"
+        http_cache = True
+
+        def cache_version(self, **loader_args):
+            raise ValueError("no version")
+
+        def load_data(self, **loader_args):
+            return "data"
+
+    route = get_route(BrokenVersionRoute)
+    response = serve_route(route, Request("/broken-version"))
+    assert response.status == 200
+    assert get_cache(response) == {"/broken-version:{}": "data"}
+
+    etag = get_headers(response)["etag"]
+    response = serve_route(
+        route, Request("/broken-version", headers={"if-none-match": etag})
+    )
+    assert response.status == 304
+
+
+def test_server_fn_is_called_in_process(routes):
+    @anvil.server.callable("routing_test_get_article")
+    def get_article(**loader_args):
+        return {"id": loader_args["params"]["id"]}
+
+    class ServerFnRoute(Route):
+        path = "/server-fn/:id"
+        server_fn = "routing_test_get_article"
+
+    # there is no uplink connection, so this would fail with anvil.server.call
+    response = serve_route(get_route(ServerFnRoute), Request("/server-fn/1"))
+    [data] = get_cache(response).values()
+    assert data == {"id": "1"}
+
+
+def test_server_timing(routes):
+    [ArticlesRoute, ArticleRoute] = routes
+    reset_server_metrics()
+
+    class SlowRoute(Route):
+        path = "/slow"
+        server_timeout = 0.05
+
+        def load_data(self, **loader_args):
+            sleep(0.1)
+
+    response = serve_route(get_route(ArticleRoute), Request("/articles/1"))
+    timing = get_headers(response)["server-timing"]
+    phases = [entry.split(";")[0] for entry in timing.split(", ")]
+    assert phases == ["match", "before_load", "meta", "data", "preload", "total"]
+
+    for id in range(2, 11):
+        serve_route(get_route(ArticleRoute), Request(f"/articles/{id}"))
+    serve_route(get_route(SlowRoute), Request("/slow"))
+
+    metrics = get_server_metrics()
+    assert metrics["ArticleRoute"]["count"] == 10
+    assert metrics["ArticleRoute"]["outcomes"] == {"ok": 10}
+    assert metrics["ArticleRoute"]["p50"] <= metrics["ArticleRoute"]["p99"]
+    assert metrics["ArticleRoute"]["phases"]["data"]["count"] == 10
+    assert get_server_metrics("SlowRoute")["outcomes"] == {"fallback": 1}
+    reset_server_metrics()
+    assert get_server_metrics() == {}
+
+
+def test_late_loads_are_not_timed(routes, monkeypatch):
+    monkeypatch.setattr(_server_route, "_timeout_slots", BoundedSemaphore(1))
+    release = Event()
+    finished = []
+
+    class SlowRoute(Route):
+        path = "/slow"
+        server_timeout = 0.01
+
+        def load_data(self, **loader_args):
+            release.wait(1)
+            finished.append(1)
+
+    timing = ServerTiming()
+    monkeypatch.setattr(_server_route, "ServerTiming", lambda: timing)
+    response = serve_route(get_route(SlowRoute), Request("/slow"))
+    assert "data" not in get_headers(response)["server-timing"]
+
+    # the late load finishes after the timing was recorded
+    total = timing.total()
+    release.set()
+    assert _server_route._timeout_slots.acquire(timeout=1)
+    _server_route._timeout_slots.release()
+    assert finished == [1]
+    timing.add("data", 1)
+    assert "data" not in timing.phases
+    assert timing.total() == total
+
+
+def test_profiling(routes, tmp_path):
+    [ArticlesRoute, ArticleRoute] = routes
+
+    class SlowRoute(Route):
+        path = "/slow"
+
+        def load_data(self, **loader_args):
+            sleep(0.05)
+
+    enable_profiling(threshold=0.04, directory=str(tmp_path), max_files=3)
+    try:
+        serve_route(get_route(ArticleRoute), Request("/articles/1"))
+        assert list(tmp_path.iterdir()) == []
+
+        for _ in range(5):
+            serve_route(get_route(SlowRoute), Request("/slow"))
+        files = list(tmp_path.iterdir())
+        assert len(files) == 3
+        assert all(f.name.startswith("SlowRoute-") for f in files)
+
+        summary = summarize_profiles()
+        assert summary["SlowRoute"]["profiles"] == 3
+        hotspots = summary["SlowRoute"]["hotspots"]
+        assert any("load_data" in h["function"] for h in hotspots)
+    finally:
+        disable_profiling()
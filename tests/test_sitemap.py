@@ -0,0 +1,89 @@
+import anvil.server
+import pytest
+from client_code.router import _sitemap
+from client_code.router._cached import clear_cache
+from client_code.router._route import Route, sorted_routes
+from client_code.router._server_cache import ServerCache
+from tests.test_server_route import Request, get_headers
+
+
+@pytest.fixture
+def routes(monkeypatch):
+    monkeypatch.setattr(anvil.server, "get_app_origin", lambda: "https://app.anvil.app")
+    monkeypatch.setattr(_sitemap, "MAX_URLS", 10)
+    server_cache = ServerCache()
+    monkeypatch.setattr(_sitemap, "get_sitemap_cache", lambda: server_cache)
+    calls = []
+
+    class IndexRoute(Route):
+        path = "/"
+
+    class ArticleRoute(Route):
+        path = "/articles/:id"
+
+        def sitemap_params(self):
+            calls.append("sitemap_params")
+            return ({"id": f"a {i}"} for i in range(25))
+
+    class UserRoute(Route):
+        path = "/users/:id"
+
+    class AdminRoute(Route):
+        path = "/admin"
+        sitemap = False
+
+    yield calls, server_cache
+
+    sorted_routes.clear()
+    clear_cache()
+
+
+def test_sitemap_urls(routes):
+    urls = list(_sitemap.iter_urls("https://app.anvil.app"))
+    assert urls[:3] == [
+        "https://app.anvil.app",
+        "https://app.anvil.app/",
+        "https://app.anvil.app/articles/a%200",
+    ]
+    assert len(urls) == 27
+    assert not any("admin" in url or "users" in url for url in urls)
+
+
+def test_sitemap_is_sharded(routes):
+    calls, server_cache = routes
+    assert _sitemap.is_sharded(60)
+    index = _sitemap.serve_index(Request("/sitemap-index.xml"), 60)
+    content = index.body.get_bytes().decode()
+    assert content.count("<sitemap>") == 3
+    assert "https://app.anvil.app/sitemap/2" in content
+
+    shard = _sitemap.serve_shard(Request("/sitemap/2"), "2", 60)
+    urls = shard.body.get_bytes().decode().split("\n")
+    assert len(urls) == 7
+    assert urls[-1] == "https://app.anvil.app/articles/a%2024"
+
+    # the urls are only enumerated once for every shard
+    assert calls == ["sitemap_params"]
+    _sitemap.serve_shard(Request("/sitemap/0"), "0", 60)
+    assert calls == ["sitemap_params"]
+
+    assert _sitemap.serve_shard(Request("/sitemap/3"), "3", 60).status == 404
+    assert _sitemap.serve_shard(Request("/sitemap/x"), "x", 60).status == 404
+
+
+def test_sitemap_is_cached(routes):
+    calls, server_cache = routes
+    response = _sitemap.serve_shard(Request("/sitemap/1"), "1", 60)
+    etag = get_headers(response)["etag"]
+    count = len(calls)
+
+    headers = {"if-none-match": etag}
+    response = _sitemap.serve_shard(Request("/sitemap/1", headers=headers), "1", 60)
+    assert response.status == 304
+    # the shard isn't regenerated while it's cached
+    assert len(calls) == count
+
+    server_cache.invalidate_tag(_sitemap.SITEMAP_TAG)
+    response = _sitemap.serve_shard(Request("/sitemap/1"), "1", 60)
+    assert response.status == 200
+    assert len(calls) > count